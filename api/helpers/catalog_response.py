@@ -0,0 +1,56 @@
+from typing import Callable
+
+from fastapi import Request, Response
+from sqlalchemy.orm import Session
+
+from services.catalog_cache import (
+    CacheEntry,
+    catalog_cache,
+    make_etag,
+    read_catalog_version,
+)
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
+
+
+def cached_json_response(
+    request: Request, db: Session, build: Callable[[dict, str], bytes]
+) -> Response:
+    """
+    Serve a catalog read with a strong ETag derived from the catalog version.
+    A matching If-None-Match gets a 304 before any ORM object is loaded;
+    otherwise the body comes from the in-process cache or
+    `build(headers, version)`, which gets the catalog version read here,
+    returns the JSON body and may add headers (e.g. X-Next-Cursor) that are
+    cached together with it.
+    """
+    version = read_catalog_version(db)
+    key = catalog_cache.make_key(request.url.path, request.query_params)
+    etag = make_etag(version, key)
+    cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=cache_headers)
+
+    # the DB version is part of the key, so other workers' syncs are seen too
+    versioned_key = (version, *key)
+    entry = catalog_cache.get(versioned_key)
+    if entry is None:
+        local_version = catalog_cache.version
+        headers: dict[str, str] = {}
+        entry = CacheEntry(body=build(headers, version), headers=headers)
+        catalog_cache.put(versioned_key, entry, local_version)
+
+    return Response(
+        content=entry.body,
+        media_type="application/json",
+        headers={**entry.headers, **cache_headers},
+    )
@@ -0,0 +1,95 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import DateTime, and_, or_
+
+
+def encode_cursor(sort_key: str, value, row_id: int) -> str:
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([sort_key, value, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_key: str, sort_column):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key, value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        if value is not None and isinstance(sort_column.type, DateTime):
+            value = datetime.fromisoformat(value)
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # a cursor only makes sense for the ordering it was issued with
+    if key != sort_key or not isinstance(row_id, int):
+        raise HTTPException(status_code=400, detail="Cursor does not match ordering")
+    return value, row_id
+
+
+def keyset_order(sort_column, id_column, descending: bool):
+    # NULLs sort as the largest value in both directions (Postgres' default),
+    # so (sort_column, id) indexes can be scanned either way
+    if descending:
+        return [sort_column.desc().nulls_first(), id_column.desc()]
+    return [sort_column.asc().nulls_last(), id_column.asc()]
+
+
+def keyset_after(sort_column, id_column, descending: bool, value, row_id: int):
+    """WHERE clause for rows strictly after (value, row_id) in keyset_order."""
+    if descending:
+        if value is None:
+            return or_(
+                sort_column.is_not(None),
+                and_(sort_column.is_(None), id_column < row_id),
+            )
+        return or_(
+            sort_column < value,
+            and_(sort_column == value, id_column < row_id),
+        )
+
+    if value is None:
+        return and_(sort_column.is_(None), id_column > row_id)
+    return or_(
+        sort_column > value,
+        and_(sort_column == value, id_column > row_id),
+        sort_column.is_(None),
+    )
+
+
+def keyset_paginate(
+    query,
+    sort_column,
+    id_column,
+    sort_key: str,
+    descending: bool,
+    limit: int | None,
+    cursor: str | None,
+    value_of=None,
+    id_of=None,
+):
+    """
+    Apply (sort_column, id) keyset pagination to `query`.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    `value_of(row)` / `id_of(row)` read the sort value and id back from a row
+    for the next cursor when rows are not plain entities.
+    """
+    if cursor:
+        value, row_id = decode_cursor(cursor, sort_key, sort_column)
+        query = query.filter(keyset_after(sort_column, id_column, descending, value, row_id))
+
+    query = query.order_by(*keyset_order(sort_column, id_column, descending))
+    if limit is None:
+        return query.all(), None
+
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    value = value_of(last) if value_of else getattr(last, sort_column.key)
+    row_id = id_of(last) if id_of else last.id
+    return rows, encode_cursor(sort_key, value, row_id)
@@ -0,0 +1,125 @@
+import orjson
+from fastapi import HTTPException
+from sqlalchemy.orm import load_only, selectinload
+
+from models import Product
+
+# Fast path for trusted DB rows: plain dicts in the exact ProductSchema /
+# CategoryBase shape, encoded with orjson, without per-field re-validation.
+
+# Explicit loaders: every relationship ProductSchema serializes is fetched in
+# one batched SELECT ... WHERE id IN (...) per relationship, never lazily
+PRODUCT_LOAD_OPTIONS = (
+    selectinload(Product.categories),
+    selectinload(Product.images),
+    selectinload(Product.additional_info_sections),
+)
+
+PRODUCT_FIELDS = (
+    "id",
+    "wix_id",
+    "name",
+    "visible_in_wix",
+    "description",
+    "weight",
+    "price",
+    "discounted_type",
+    "discounted_amount",
+    "discounted_price",
+    "created_date",
+    "last_updated",
+)
+
+
+def category_to_dict(category) -> dict:
+    return {
+        "id": category.id,
+        "wix_id": category.wix_id,
+        "name": category.name,
+        "description": category.description,
+    }
+
+
+def _images(product) -> list[dict]:
+    return [
+        {"id": image.id, "media_url": image.media_url, "thumbnail_url": image.thumbnail_url}
+        for image in product.images
+    ]
+
+
+def _additional_info_sections(product) -> list[dict]:
+    return [
+        {"id": info.id, "title": info.title, "description": info.description}
+        for info in product.additional_info_sections
+    ]
+
+
+def _categories(product) -> list[dict]:
+    return [category_to_dict(category) for category in product.categories]
+
+
+PRODUCT_RELATIONSHIPS = {
+    "images": (Product.images, _images),
+    "additional_info_sections": (Product.additional_info_sections, _additional_info_sections),
+    "categories": (Product.categories, _categories),
+}
+
+# every field of ProductSchema, in its order
+PRODUCT_FIELD_NAMES = PRODUCT_FIELDS + tuple(PRODUCT_RELATIONSHIPS)
+
+
+def parse_fields(fields: str | None) -> tuple[str, ...] | None:
+    """
+    Parse a `fields=name,price,images` sparse fieldset. id is always
+    included. Returns None (= every field) when no fieldset was given.
+    """
+    if not fields:
+        return None
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in PRODUCT_FIELD_NAMES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return tuple(dict.fromkeys(["id", *requested]))
+
+
+def projection_options(fields: tuple[str, ...], *columns) -> list:
+    """
+    Loader options for a sparse fieldset: only the requested columns (plus
+    `columns`, e.g. the sort column for cursors) are selected, and only the
+    requested relationships are loaded.
+    """
+    attributes = [getattr(Product, name) for name in fields if name in PRODUCT_FIELDS]
+    options = [load_only(*attributes, *columns)]
+    for name in fields:
+        if name in PRODUCT_RELATIONSHIPS:
+            options.append(selectinload(PRODUCT_RELATIONSHIPS[name][0]))
+    return options
+
+
+def product_to_dict(product, fields: tuple[str, ...] = PRODUCT_FIELD_NAMES) -> dict:
+    data = {}
+    for name in fields:
+        relationship = PRODUCT_RELATIONSHIPS.get(name)
+        data[name] = relationship[1](product) if relationship else getattr(product, name)
+    return data
+
+
+def dump_products(products, fields: tuple[str, ...] = PRODUCT_FIELD_NAMES) -> bytes:
+    # OPT_UTC_Z matches pydantic's "Z" suffix for UTC datetimes
+    return orjson.dumps(
+        [product_to_dict(product, fields) for product in products], option=orjson.OPT_UTC_Z
+    )
+
+
+def dump_product(product, fields: tuple[str, ...] = PRODUCT_FIELD_NAMES) -> bytes:
+    return orjson.dumps(product_to_dict(product, fields), option=orjson.OPT_UTC_Z)
+
+
+def render_product(product) -> str:
+    # one element of dump_products, stored as the product's read model
+    return dump_product(product).decode()
+
+
+def join_rendered(documents) -> bytes:
+    # stitch pre-rendered product documents into a JSON array
+    return ("[" + ",".join(documents) + "]").encode()
@@ -1,42 +1,109 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+from typing import Iterable, Iterator
+
 from dateutil import parser
 
+_EMPTY: dict = {}
+
+
+def parse_wix_datetime(value: str | None) -> datetime | None:
+    """
+    Wix timestamps are ISO 8601 ("2024-06-01T10:00:00.000Z"), which
+    datetime.fromisoformat handles many times faster than dateutil.
+    Anything it can't read still goes through dateutil.
+
+    Returned as naive UTC, like the DateTime columns and the sync
+    watermark: an aware value would be shifted into the DB session's
+    timezone on Postgres.
+    """
+    if not value:
+        return None
+    try:
+        if value.endswith("Z"):
+            value = value[:-1] + "+00:00"
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        parsed = parser.parse(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _media_url(item: dict) -> str | None:
+    return (item.get("image") or _EMPTY).get("url") or (item.get("thumbnail") or _EMPTY).get("url")
+
+
+def _media_images(media: dict) -> list[dict]:
+    # every image of the product (media.items), mainMedia when there are none
+    main = media.get("mainMedia") or _EMPTY
+    items = media.get("items") or ([main] if main else [])
+    main_id, main_url = main.get("id"), _media_url(main)
+    images = []
+    seen = set()
+    has_main = False
+    for item in items:
+        media_url = _media_url(item)
+        # videos without a still have nothing to show
+        if not media_url or media_url in seen:
+            continue
+        seen.add(media_url)
+        thumbnail_url = (item.get("thumbnail") or _EMPTY).get("url")
+        # flag only the item that is media.mainMedia (by id, else by url)
+        if main_id and item.get("id"):
+            is_main = item["id"] == main_id
+        else:
+            is_main = media_url == main_url
+        is_main = is_main and not has_main
+        has_main = has_main or is_main
+        images.append(
+            {"media_url": media_url, "thumbnail_url": thumbnail_url or media_url, "is_main_media": is_main}
+        )
+    return images
+
 
 def map_wix_product_to_db_model(wix_product: dict) -> dict:
-    price_data = wix_product.get("priceData", {})
-    discount_data = wix_product.get("discount", {})
-
-    product_data = {
-        "wix_id": wix_product.get("id"),
-        "name": wix_product.get("name"),
-        "description": wix_product.get("description"),
-        "visible_in_wix": wix_product.get("visible", True),
-        "weight": wix_product.get("weight", 0.0),
+    get = wix_product.get
+    price_data = get("priceData") or _EMPTY
+    discount_data = get("discount") or _EMPTY
+
+    return {
+        "wix_id": get("id"),
+        "name": get("name"),
+        "description": get("description"),
+        "visible_in_wix": get("visible", True),
+        "weight": get("weight", 0.0),
         "price": price_data.get("price", 0.0),
         "discounted_price": price_data.get("discountedPrice", 0.0),
         "discounted_type": discount_data.get("type"),
         "discounted_amount": discount_data.get("amount", 0.0),
-        "created_date": parser.parse(wix_product.get("createdDate")),
-        "last_updated": parser.parse(wix_product.get("lastUpdated")),
-        "images": [],  # to fill
-        "category_ids": wix_product.get("collectionIds"),  # to fill
-        "additional_info": [],  # optional
+        "created_date": parse_wix_datetime(get("createdDate")),
+        "last_updated": parse_wix_datetime(get("lastUpdated")),
+        "images": _media_images(get("media") or _EMPTY),
+        "category_ids": get("collectionIds"),
+        "additional_info": [
+            {"title": section.get("title"), "description": section.get("description")}
+            for section in get("additionalInfoSections") or ()
+        ],
     }
 
-    # Images (media.items -> image.url)
 
-    main_media = wix_product.get("media", {}).get("mainMedia", {})
-    image_data = {
-        "media_url": main_media.get("thumbnail", {}).get("url", {}),
-        "thumbnail_url": main_media.get("thumbnail", {}).get("url", {}),
-    }
-
-    if image_data.get("media_url"):
-        product_data["images"].append(image_data)
+def map_wix_products(items: Iterable[dict]) -> Iterator[dict]:
+    """
+    Map raw Wix products one at a time. Pass an iterator (or a page that is
+    dropped afterwards) so a large page is never held raw and mapped at once.
+    """
+    for item in items:
+        yield map_wix_product_to_db_model(item)
 
-    # Optional: Additional Info
-    for section in wix_product.get("additionalInfoSections", []):
-        product_data["additional_info"].append(
-            {"title": section.get("title"), "description": section.get("description")}
-        )
 
-    return product_data
+def product_content_hash(product_data: dict, category_ids: list[int]) -> str:
+    """
+    Stable hash of a mapped product. `category_ids` are the resolved local
+    category ids, so a product whose collection was synced later still
+    counts as changed.
+    """
+    payload = {**product_data, "category_ids": sorted(category_ids)}
+    encoded = json.dumps(payload, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()
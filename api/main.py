@@ -6,8 +6,16 @@ from database import engine
 from settings import get_settings
 from apscheduler.schedulers.background import BackgroundScheduler
 
-from routers import auth, api_user, product
-from tasks.cleanup import cleanup_expired_refresh_tokens
+from routers import auth, api_user, product, wix_webhook
+from tasks.cleanup import cleanup_expired_refresh_tokens, cleanup_sent_emails
+from services.sync_jobs import shutdown_sync_jobs
+from services.product_search import create_search_index
+from services.schema_upgrade import upgrade_schema
+from services.product_read_model import backfill_read_model
+from services.wix_webhook_service import wix_webhook_coalescer
+from services.wix_api_service import start_wix_client, close_wix_client
+from services.email_outbox import email_outbox_dispatcher
+from services.brevo_email import start_brevo_client, close_brevo_client
 
 
 settings = get_settings()
@@ -15,16 +23,25 @@ settings = get_settings()
 
 scheduler = BackgroundScheduler()
 scheduler.add_job(cleanup_expired_refresh_tokens, "interval", hours=24)  # every 6h
+scheduler.add_job(cleanup_sent_emails, "interval", hours=24)
 
 
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    await start_wix_client()
+    await start_brevo_client()
+    email_outbox_dispatcher.start()
 
     if settings.SCHEDULER_ACTIVE:
         scheduler.start()
     yield  # app runs during this period
+    await email_outbox_dispatcher.close()
+    await close_brevo_client()
+    await wix_webhook_coalescer.close()
+    shutdown_sync_jobs()
+    await close_wix_client()
     scheduler.shutdown()  # cleanly stop on shutdown
 
 
@@ -44,7 +61,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 models.Base.metadata.create_all(bind=engine)
+# columns/indexes added since the tables were created (before the backfill reads them)
+upgrade_schema(engine)
+create_search_index(engine)
+backfill_read_model(engine)
 
 app.include_router(auth.router)
 app.include_router(api_user.router)
 app.include_router(product.router)
+app.include_router(wix_webhook.router)
@@ -7,9 +7,13 @@ from sqlalchemy import (
     ForeignKey,
     DateTime,
     Double,
+    Index,
+    JSON,
     Table,
+    Text,
 )
-from sqlalchemy.orm import relationship, mapped_column, Mapped
+from sqlalchemy import event
+from sqlalchemy.orm import deferred, relationship, mapped_column, Mapped
 from datetime import datetime, timezone
 from typing import Optional
 
@@ -140,10 +144,52 @@ class CompanyInvite(Base):
 
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow, nullable=False)
 
+class SyncState(Base):
+    __tablename__ = "sync_states"
+
+    # e.g. "wix_products"
+    source: Mapped[str] = mapped_column(String(100), primary_key=True)
+    # highest source-side last_updated we have ingested (naive UTC, like Product.last_updated)
+    watermark: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    # bumped on every sync that changed data (row "catalog" drives ETags)
+    generation: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow, onupdate=utcnow, nullable=False)
+
+
+class EmailOutbox(Base):
+    """
+    Transactional outbox for emails: the row is committed together with the
+    change that triggers the mail and delivered by services.email_outbox.
+    """
+    __tablename__ = "email_outbox"
+    __table_args__ = (Index("ix_email_outbox_due", "status", "next_attempt_at"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+
+    to_email: Mapped[str] = mapped_column(String(255), nullable=False, index=True)
+    to_name: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    template_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    params: Mapped[dict] = mapped_column(JSON, default=dict, nullable=False)
+
+    # pending -> sending (claimed by a dispatcher) -> sent | failed
+    status: Mapped[str] = mapped_column(String(20), default="pending", nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    # when a pending row may be sent, or when a claim on a sending row expires
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow, nullable=False)
+    claim_token: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # Brevo messageId of the delivered mail
+    provider_message_id: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow, nullable=False)
+    sent_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
 class ProductAdditionalInfo(Base):
     __tablename__ = "product_additional_infos"
     id = Column(Integer, primary_key=True, index=True)
-    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False, index=True)
     title = Column(String)
     description = Column(String)
 
@@ -156,7 +202,7 @@ class ProductImage(Base):
     media_url = Column(String)  # path to local or S3 storage
     thumbnail_url = Column(String)  # path to local or S3 storage
     is_main_media = Column(Boolean, default=True)
-    product_id = Column(Integer, ForeignKey("products.id"))
+    product_id = Column(Integer, ForeignKey("products.id"), index=True)
     product = relationship("Product", back_populates="images")
 
 
@@ -165,11 +211,19 @@ ProductCategory = Table(
     Base.metadata,
     Column("product_id", ForeignKey("products.id"), primary_key=True),
     Column("category_id", ForeignKey("categories.id"), primary_key=True),
+    # the primary key only serves lookups by product_id
+    Index("ix_product_categories_category_id", "category_id"),
 )
 
 
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        # (sort column, id) indexes backing keyset pagination
+        Index("ix_products_last_updated_id", "last_updated", "id"),
+        Index("ix_products_price_id", "price", "id"),
+        Index("ix_products_name_id", "name", "id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     wix_id = Column(String, unique=True)
     name = Column(String)
@@ -182,6 +236,11 @@ class Product(Base):
     discounted_price = Column(Double)
     created_date = Column(DateTime)
     last_updated = Column(DateTime)
+    # sha256 of the mapped Wix payload, used by sync to skip unchanged products
+    content_hash = Column(String(64))
+    # pre-rendered ProductSchema JSON (read model), written by sync; deferred
+    # so normal ORM loads don't pull it
+    rendered_json = deferred(Column(Text))
     additional_info_sections = relationship(
         "ProductAdditionalInfo", back_populates="product", cascade="all, delete"
     )
@@ -193,6 +252,14 @@ class Product(Base):
     )
 
 
+@event.listens_for(Product.__table__, "after_create")
+def _create_search_table(target, connection, **kw):
+    # every create_all (app, scripts, tests) gets the full-text table with products
+    from services.product_search import create_search_table
+
+    create_search_table(connection)
+
+
 class Category(Base):
     __tablename__ = "categories"
     id = Column(Integer, primary_key=True, index=True)
@@ -22,7 +22,8 @@ from dependencies.deps import (
     SWAGGER_ACTIVE,
     COOLDOWN_RESEND_VERIFICATION_MAIL_MINUTES
 )
-from helpers.email import send_confirmation_mail
+from helpers.email import queue_confirmation_mail
+from services.email_outbox import email_outbox_dispatcher
 from services.token_service import verify_token, create_token, revoke_refresh_token
 from models import APIUser, Company, CompanyInvite
 
@@ -62,7 +63,7 @@ async def create_user(db: db_dependency, req: RegisterFirstRequest):
         raise HTTPException(status_code=400, detail="Please accept terms & conditions")
 
 
-    # Create company + admin user in one transaction
+    # Create company + admin user + confirmation mail (outbox) in one transaction
     try:
         company = Company(name=company_name, slug=company_slug)
         db.add(company)
@@ -76,18 +77,13 @@ async def create_user(db: db_dependency, req: RegisterFirstRequest):
             role="admin",
             newsletter=bool(req.newsletter),
             company_id=company.id,
+            email_verification_sent_at=datetime.now(timezone.utc),
         )
         db.add(user)
-        db.commit()
-        db.refresh(user)
-
-    except IntegrityError:
-        db.rollback()
-        # Handles race conditions (two people try same company/email at same time)
-        raise HTTPException(status_code=409, detail="Email or company already exists")
+        db.flush()  # gives user.id for the confirmation token
 
-    try:
-        await send_confirmation_mail(
+        queue_confirmation_mail(
+            db,
             email= user.email,
             user_id= user.id,
             user_role= user.role,
@@ -95,15 +91,21 @@ async def create_user(db: db_dependency, req: RegisterFirstRequest):
             last_name =user.last_name,
             company_name = company.name
         )
-        email_sent=True
-        user.email_verification_sent_at = datetime.now(timezone.utc)
         db.commit()
-    except Exception as e:
-        email_sent=False
-        pass
+        db.refresh(user)
+
+    except IntegrityError:
+        db.rollback()
+        # Handles race conditions (two people try same company/email at same time)
+        raise HTTPException(status_code=409, detail="Email or company already exists")
+
+    # 📬 delivered in the background, retried if Brevo is slow or down
+    email_outbox_dispatcher.wake()
 
     return {
-        "email_sent": email_sent,
+        # kept for existing clients: the mail is in the outbox, sent in the background
+        "email_sent": True,
+        "email_queued": True,
         "id": user.id,
         "email": user.email,
         "role": user.role
@@ -214,18 +216,20 @@ async def resend_email_confirmation(
                 "message": "Please wait a few minutes before requesting another email."
             }
 
-    # Send email
-        await send_confirmation_mail(
-            email= user.email,
-            user_id= user.id,
-            user_role= user.role,
-            first_name=user.first_name,
-            last_name =user.last_name,
-            company_name = user.company.name if user.company else "" 
-        )
+    # Queue email (same commit as the cooldown timestamp)
+    queue_confirmation_mail(
+        db,
+        email= user.email,
+        user_id= user.id,
+        user_role= user.role,
+        first_name=user.first_name,
+        last_name =user.last_name,
+        company_name = user.company.name if user.company else ""
+    )
 
     user.email_verification_sent_at = now
     db.commit()
+    email_outbox_dispatcher.wake()
 
     return {
         "message": "If the email exists, a confirmation link has been sent."
@@ -1,191 +1,450 @@
-from fastapi import APIRouter, HTTPException, Query
-from sqlalchemy import asc, desc
-from sqlalchemy.orm import joinedload
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy import func
+from typing import List, Literal
 
 from starlette import status
 
-from services.wix_api_service import wix_post_request
-from dependencies.deps import db_dependency, user_dependency
-from routers.product_pydantic import ProductSchema, CategoryBase, CategorySchema
-from helpers.wix_mapper import map_wix_product_to_db_model
-from models import Product, ProductAdditionalInfo, Category, ProductImage
+from database import SessionLocal
+from dependencies.deps import db_dependency, user_dependency, admin_dependency
+from helpers.pagination import decode_cursor, encode_cursor, keyset_paginate
+from helpers.catalog_response import cached_json_response
+from helpers.product_serializer import (
+    PRODUCT_LOAD_OPTIONS,
+    dump_product,
+    dump_products,
+    join_rendered,
+    parse_fields,
+    projection_options,
+)
+from services.catalog_cache import catalog_cache
+from services.catalog_index import catalog_index
+from services.catalog_export import iter_csv, iter_ndjson
+from services.product_read_model import rendered_documents
+from services.product_search import search_subquery, ilike_search_filter
+from routers.product_pydantic import ProductSchema, CategorySchema, SyncJobSchema
+from services.product_sync_service import run_wix_product_sync, run_wix_category_sync
+from services.wix_api_service import wix_client_stats
+from services.sync_jobs import SyncJob, submit_sync_job, get_sync_job, run_in_sync_worker
+from models import Product, Category, ProductCategory
 
 
 router = APIRouter(prefix="/product", tags=["Product"])
 
 
+def _sync_session(runner):
+    # jobs outlive the request, so they get their own session
+    async def run(job: SyncJob):
+        db = SessionLocal()
+        try:
+            await runner(db, job)
+        finally:
+            await run_in_sync_worker(db.close)
+
+    return run
+
+
+async def _run_category_sync(db, job: SyncJob):
+    await run_wix_category_sync(db, job=job)
+
+
 @router.post(
     "/sync-wix-categories",
-    status_code=status.HTTP_200_OK,
-    response_model=List[CategoryBase],
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=SyncJobSchema,
 )
-async def sync_wix_categories_route(
-    db: db_dependency,
+async def sync_wix_categories_route(user: user_dependency):
+    # returns the running job if a category sync is already in progress
+    return submit_sync_job("categories", _sync_session(_run_category_sync))
+
+
+# can be run after syncing categories
+@router.post(
+    "/sync-wix-products",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=SyncJobSchema,
+)
+async def sync_wix_products(
     user: user_dependency,
+    full: bool = Query(False, description="Re-sync the whole catalog instead of changes since the last sync"),
+):
+    async def run_product_sync(db, job: SyncJob):
+        # Pipelined batched upsert: next pages download while a batch is written
+        result = await run_wix_product_sync(db, full=full, job=job)
+        job.counts = result.counts()
+
+    # returns the running job if a product sync in the same mode is already
+    # in progress (409 if it's in the other mode)
+    return submit_sync_job("products", _sync_session(run_product_sync), full=full)
+
+
+@router.get("/sync-jobs/{job_id}", response_model=SyncJobSchema)
+async def get_sync_job_status(job_id: str, user: user_dependency):
+    job = get_sync_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Sync job not found")
+    return job
+
+
+# columns /product/filter may sort by; keyset pagination needs a real column
+PRODUCT_SORT_COLUMNS = {
+    "last_updated": Product.last_updated,
+    "created_date": Product.created_date,
+    "price": Product.price,
+    "name": Product.name,
+    "id": Product.id,
+}
+
+PRODUCT_PAGE_MAX_LIMIT = 500
+CATEGORY_PRODUCTS_DEFAULT_LIMIT = 50
+
+product_list_adapter = TypeAdapter(List[ProductSchema])
+category_list_adapter = TypeAdapter(List[CategorySchema])
+category_adapter = TypeAdapter(CategorySchema)
+
+
+def _paginate_products(
+    query,
+    headers: dict,
+    order_by,
+    order_dir,
+    limit,
+    cursor,
+    search=None,
+    fast=False,
+    fields=None,
 ):
-    try:
-        data = await wix_post_request("stores/v1/collections/query")
-        synced_categories = []
+    """
+    Keyset-paginate a Product query. Returns Product objects (only `fields`
+    loaded when given), or with `fast` the pre-rendered JSON documents of
+    the page (no ORM objects built).
+    """
+    if order_by == "relevance":
+        if search is None:
+            raise HTTPException(status_code=400, detail="Ordering by relevance needs q")
+        sort_column, sort_key, descending = search.c.score, "relevance", False
+    else:
+        sort_column = PRODUCT_SORT_COLUMNS.get(order_by)
+        if sort_column is None:
+            raise HTTPException(status_code=400, detail=f"Cannot order by '{order_by}'")
+        sort_key, descending = f"{order_by}:{order_dir}", order_dir == "desc"
+
+    if fields is not None:
+        # sparse fieldset: the cursor still needs the sort column
+        cursor_columns = () if order_by == "relevance" else (sort_column,)
+        load_options = projection_options(fields, *cursor_columns)
+    else:
+        load_options = PRODUCT_LOAD_OPTIONS
+
+    if fast and fields is None:
+        # plain column rows: id, sort value and the read model document
+        query = query.with_entities(
+            Product.id, sort_column.label("sort_value"), Product.rendered_json
+        )
+        value_of = lambda row: row.sort_value
+        id_of = lambda row: row.id
+    elif order_by == "relevance":
+        query = query.options(*load_options).add_columns(search.c.score)
+        value_of = lambda row: row.score
+        id_of = lambda row: row.Product.id
+    else:
+        query = query.options(*load_options)
+        value_of = id_of = None
+
+    rows, next_cursor = keyset_paginate(
+        query,
+        sort_column,
+        Product.id,
+        sort_key=sort_key,
+        descending=descending,
+        limit=limit,
+        cursor=cursor,
+        value_of=value_of,
+        id_of=id_of,
+    )
 
-        for item in data.get("collections", []):
-            category = db.query(Category).filter_by(wix_id=item["id"]).first()
-            if not category:
-                category = Category(wix_id=item["id"])
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    if fast and fields is None:
+        return rendered_documents(query.session, [(row.id, row.rendered_json) for row in rows])
+    if order_by == "relevance":
+        return [row.Product for row in rows]
+    return rows
 
-            category.name = item.get("name")
-            category.description = item.get("description")
-            category.visible_in_wix = item.get("visible", True)
-            db.add(category)
-            synced_categories.append(category)
 
-        db.commit()
-        return synced_categories
+def _products_by_ids(db, ids: list[int], fast=False, fields=None) -> list:
+    """Products (or read model documents with `fast`) for `ids`, in that order."""
+    if not ids:
+        return []
+    if fast and fields is None:
+        rows = db.query(Product.id, Product.rendered_json).filter(Product.id.in_(ids))
+        by_id = dict(rows.all())
+        return rendered_documents(db, [(product_id, by_id[product_id]) for product_id in ids])
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    load_options = PRODUCT_LOAD_OPTIONS if fields is None else projection_options(fields)
+    products = db.query(Product).options(*load_options).filter(Product.id.in_(ids))
+    by_id = {product.id: product for product in products}
+    return [by_id[product_id] for product_id in ids]
 
 
-# can be run after syncing categories
-@router.post(
-    "/sync-wix-products",
-    status_code=status.HTTP_200_OK,
-    response_model=List[ProductSchema],
-)
-async def sync_wix_products(user: user_dependency, db: db_dependency):
-    try:
-        data = await wix_post_request("stores-reader/v1/products/query")
-        synced_products = []
-
-        for item in data.get("products", []):
-            mapped = map_wix_product_to_db_model(item)
-
-            # Create/update product
-            product = db.query(Product).filter_by(wix_id=mapped["wix_id"]).first()
-            if not product:
-                product = Product(wix_id=mapped["wix_id"])
-            for field in [
-                "name",
-                "description",
-                "price",
-                "discounted_price",
-                "discounted_type",
-                "discounted_amount",
-                "created_date",
-                "last_updated",
-                "visible_in_wix",
-                "weight",
-            ]:
-                setattr(product, field, mapped[field])
-
-            db.add(product)
-            db.commit()
-            db.refresh(product)
-
-            # 3. Replace image(s)
-            db.query(ProductImage).filter_by(product_id=product.id).delete()
-            for image in mapped["images"]:
-                db.add(
-                    ProductImage(
-                        media_url=image["media_url"],
-                        thumbnail_url=image["thumbnail_url"],
-                        product_id=product.id,
-                    )
-                )
-
-            # 4. Replace categories
-            product.categories.clear()
-            for wix_cat_id in mapped.get("category_ids", []):
-                category = db.query(Category).filter_by(wix_id=wix_cat_id).first()
-                if category:
-                    product.categories.append(category)
-
-            # 5. Replace additional info
-            db.query(ProductAdditionalInfo).filter_by(product_id=product.id).delete()
-            for info in mapped.get("additional_info", []):
-                db.add(
-                    ProductAdditionalInfo(
-                        title=info["title"],
-                        description=info["description"],
-                        product_id=product.id,
-                    )
-                )
-
-            db.commit()
-            synced_products.append(product)
-
-        return synced_products
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+def _paginate_from_index(
+    db, index, headers: dict, order_by, order_dir, limit, cursor, fast=False, fields=None, **filters
+):
+    # same sort keys and cursor format as _paginate_products, so pages from
+    # the index and from SQL can follow each other
+    sort_key = f"{order_by}:{order_dir}"
+    after = decode_cursor(cursor, sort_key, PRODUCT_SORT_COLUMNS[order_by]) if cursor else None
+    ids, more = index.page(order_by, order_dir == "desc", limit, after, **filters)
+    if more:
+        value = index.columns[order_by].value_of(ids[-1])
+        headers["X-Next-Cursor"] = encode_cursor(sort_key, value, ids[-1])
+    return _products_by_ids(db, ids, fast, fields)
+
+
+def _dump(adapter: TypeAdapter, data) -> bytes:
+    # same validation/serialization as response_model, done once for the cache
+    return adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+
+
+def _dump_products(products, fast: bool, fields=None) -> bytes:
+    if fields is not None:
+        return dump_products(products, fields)
+    if fast:
+        # products are already rendered documents from the read model
+        return join_rendered(products)
+    return _dump(product_list_adapter, products)
 
 
 # 🚀 Get all products
 @router.get("/", response_model=List[ProductSchema])
-def get_all_products(db: db_dependency, user: user_dependency):
-    products = db.query(Product).order_by(Product.last_updated.desc()).all()
-    return products
+def get_all_products(
+    request: Request,
+    db: db_dependency,
+    user: user_dependency,
+    limit: int | None = Query(None, ge=1, le=PRODUCT_PAGE_MAX_LIMIT),
+    cursor: str | None = Query(None, description="X-Next-Cursor of the previous page"),
+    fast: bool = Query(False, description="Serve the pre-rendered read model documents"),
+    fields: str | None = Query(None, description="Comma-separated fields to return, e.g. name,price,images"),
+):
+    projection = parse_fields(fields)
+
+    def build(headers: dict, version: str) -> bytes:
+        products = _paginate_products(
+            db.query(Product),
+            headers,
+            "last_updated",
+            "desc",
+            limit,
+            cursor,
+            fast=fast,
+            fields=projection,
+        )
+        return _dump_products(products, fast, projection)
+
+    return cached_json_response(request, db, build)
 
 @router.get("/filter", response_model=List[ProductSchema])
 def filter_products(
+    request: Request,
     db: db_dependency,
     user: user_dependency,
     name: str | None = Query(None),
+    q: str | None = Query(None, description="Full-text search in name, description and additional info"),
     min_price: float | None = Query(None),
     max_price: float | None = Query(None),
     category_id: int | None = Query(None),
-    order_by: str | None = Query("last_updated"),
+    order_by: str | None = Query(None, description="Defaults to relevance with q, else last_updated"),
     order_dir: str | None = Query("desc"),
+    limit: int | None = Query(None, ge=1, le=PRODUCT_PAGE_MAX_LIMIT),
+    cursor: str | None = Query(None, description="X-Next-Cursor of the previous page"),
+    fast: bool = Query(False, description="Serve the pre-rendered read model documents"),
+    fields: str | None = Query(None, description="Comma-separated fields to return, e.g. name,price,images"),
+):
+    projection = parse_fields(fields)
+
+    def build(headers: dict, version: str) -> bytes:
+        sort = order_by or ("relevance" if q else "last_updated")
+        direction = "desc" if order_dir == "desc" else "asc"
+
+        # ⚡ Price/category/sort only: answer from the in-memory index if it is current
+        index = None
+        if catalog_index.enabled and not name and not q and limit is not None:
+            index = catalog_index.lookup(version)
+        if index is not None and index.supports(sort):
+            products = _paginate_from_index(
+                db,
+                index,
+                headers,
+                sort,
+                direction,
+                limit,
+                cursor,
+                fast=fast,
+                fields=projection,
+                min_price=min_price,
+                max_price=max_price,
+                category_id=category_id or None,
+            )
+            return _dump_products(products, fast, projection)
+
+        # selectin loading keeps one row per product, so LIMIT applies to products
+        query = db.query(Product)
+
+        # 🔍 Filtering
+        if name:
+            query = query.filter(Product.name.ilike(f"%{name}%"))
+
+        search = None
+        if q:
+            search = search_subquery(db, q)
+            if search is None:
+                query = query.filter(ilike_search_filter(q))
+            else:
+                query = query.join(search, search.c.product_id == Product.id)
+
+        if min_price is not None:
+            query = query.filter(Product.price >= min_price)
+
+        if max_price is not None:
+            query = query.filter(Product.price <= max_price)
+
+        if category_id:
+            query = query.filter(Product.categories.any(Category.id == category_id))
+
+        # ↕️ Ordering + keyset pagination on (sort column, id)
+        if search is None and not order_by:
+            sort = "last_updated"
+        products = _paginate_products(
+            query, headers, sort, direction, limit, cursor, search, fast=fast, fields=projection
+        )
+        return _dump_products(products, fast, projection)
+
+    return cached_json_response(request, db, build)
+
+
+# 📤 Whole catalog as a stream, for downstream jobs
+EXPORT_FORMATS = {
+    "ndjson": (iter_ndjson, "application/x-ndjson"),
+    "csv": (iter_csv, "text/csv"),
+}
+
+
+@router.get("/export")
+def export_products(
+    user: user_dependency,
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
 ):
-    query = db.query(Product).options(
-        joinedload(Product.categories),
-        joinedload(Product.images),
-        joinedload(Product.additional_info_sections),
+    # rows are read from a server-side cursor chunk by chunk, so memory
+    # stays flat no matter how big the catalog is
+    iter_rows, media_type = EXPORT_FORMATS[export_format]
+    return StreamingResponse(
+        iter_rows(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="products.{export_format}"'},
     )
 
-    # 🔍 Filtering
-    if name:
-        query = query.filter(Product.name.ilike(f"%{name}%"))
-
-    if min_price is not None:
-        query = query.filter(Product.price >= min_price)
-
-    if max_price is not None:
-        query = query.filter(Product.price <= max_price)
-
-    if category_id:
-        query = query.join(Product.categories).filter(Category.id == category_id)
-
-    # ↕️ Ordering
-    sort_column = getattr(Product, order_by, None)
-    if sort_column is not None:
-        if order_dir == "desc":
-            query = query.order_by(desc(sort_column))
-        else:
-            query = query.order_by(asc(sort_column))
-
-    return query.all()
-
 
 # 🚀 Get single product by ID
 @router.get("/product/{id}", response_model=ProductSchema)
-def get_product_by_id(id: int, db: db_dependency, user: user_dependency):
-    product = db.query(Product).filter(Product.id == id).first()
+def get_product_by_id(
+    id: int,
+    db: db_dependency,
+    user: user_dependency,
+    fields: str | None = Query(None, description="Comma-separated fields to return, e.g. name,price,images"),
+):
+    projection = parse_fields(fields)
+    load_options = PRODUCT_LOAD_OPTIONS if projection is None else projection_options(projection)
+    product = (
+        db.query(Product)
+        .options(*load_options)
+        .filter(Product.id == id)
+        .first()
+    )
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
+    if projection is not None:
+        return Response(content=dump_product(product, projection), media_type="application/json")
     return product
 
 
+def _categories_with_counts(db, *criteria) -> list[Category]:
+    # one aggregate query; product_count rides along on the ORM objects
+    rows = (
+        db.query(Category, func.count(ProductCategory.c.product_id))
+        .outerjoin(ProductCategory, ProductCategory.c.category_id == Category.id)
+        .filter(*criteria)
+        .group_by(Category.id)
+        .order_by(Category.name.asc())
+        .all()
+    )
+    for category, product_count in rows:
+        category.product_count = product_count
+    return [category for category, _ in rows]
+
+
 # 📦 Get all categories
 @router.get("/categories", response_model=List[CategorySchema])
-def get_all_categories(db: db_dependency, user: user_dependency):
-    categories = db.query(Category).order_by(Category.name.asc()).all()
-    return categories
+def get_all_categories(request: Request, db: db_dependency, user: user_dependency):
+    def build(headers: dict, version: str) -> bytes:
+        return _dump(category_list_adapter, _categories_with_counts(db))
+
+    return cached_json_response(request, db, build)
 
 
 # 📦 Get single category by ID
 @router.get("/category/{id}", response_model=CategorySchema)
-def get_category_by_id(id: int, db: db_dependency, user: user_dependency):
-    category = db.query(Category).filter(Category.id == id).first()
-    if not category:
-        raise HTTPException(status_code=404, detail="Category not found")
-    return category
+def get_category_by_id(id: int, request: Request, db: db_dependency, user: user_dependency):
+    def build(headers: dict, version: str) -> bytes:
+        categories = _categories_with_counts(db, Category.id == id)
+        if not categories:
+            raise HTTPException(status_code=404, detail="Category not found")
+        return _dump(category_adapter, categories[0])
+
+    return cached_json_response(request, db, build)
+
+
+# 📦 Products of a category, paged
+@router.get("/category/{id}/products", response_model=List[ProductSchema])
+def get_category_products(
+    id: int,
+    request: Request,
+    db: db_dependency,
+    user: user_dependency,
+    order_by: str = Query("last_updated"),
+    order_dir: str = Query("desc"),
+    limit: int = Query(CATEGORY_PRODUCTS_DEFAULT_LIMIT, ge=1, le=PRODUCT_PAGE_MAX_LIMIT),
+    cursor: str | None = Query(None, description="X-Next-Cursor of the previous page"),
+    fast: bool = Query(False, description="Serve the pre-rendered read model documents"),
+    fields: str | None = Query(None, description="Comma-separated fields to return, e.g. name,price,images"),
+):
+    projection = parse_fields(fields)
+
+    def build(headers: dict, version: str) -> bytes:
+        if not db.query(Category.id).filter(Category.id == id).first():
+            raise HTTPException(status_code=404, detail="Category not found")
+
+        query = (
+            db.query(Product)
+            .join(ProductCategory, ProductCategory.c.product_id == Product.id)
+            .filter(ProductCategory.c.category_id == id)
+        )
+        direction = "desc" if order_dir == "desc" else "asc"
+        products = _paginate_products(
+            query, headers, order_by, direction, limit, cursor, fast=fast, fields=projection
+        )
+        return _dump_products(products, fast, projection)
+
+    return cached_json_response(request, db, build)
+
+
+@router.get("/cache-stats")
+def get_catalog_cache_stats(admin: admin_dependency):
+    # hit/miss/eviction counters of this worker's catalog cache
+    return catalog_cache.stats()
+
+
+@router.get("/wix-stats")
+async def get_wix_client_stats(admin: admin_dependency):
+    # requests/retries/429s and read cache hits/coalesced calls of this worker's Wix client
+    return wix_client_stats()
@@ -56,8 +56,25 @@ class ProductBase(BaseModel):
 
 
 class CategorySchema(CategoryBase):
-    products: List[ProductBase] = []
+    # products are paged through /product/category/{id}/products
+    product_count: int = 0
 
 
 class ProductSchema(ProductBase):
     categories: List[CategoryBase] = []
+
+
+class SyncJobSchema(BaseModel):
+    id: str
+    resource: str
+    full: bool
+    status: Literal["queued", "running", "succeeded", "failed", "cancelled"]
+    started_at: datetime
+    finished_at: datetime | None
+    elapsed_seconds: float
+    pages_fetched: int
+    rows_written: int
+    counts: dict[str, int] = {}
+    errors: List[str] = []
+
+    model_config = {"from_attributes": True}
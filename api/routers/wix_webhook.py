@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Request
+
+from services.wix_webhook_service import (
+    decode_wix_webhook,
+    parse_wix_event,
+    wix_webhook_coalescer,
+)
+
+
+router = APIRouter(prefix="/wix", tags=["Wix"])
+
+
+# 🔔 Wix catalog webhooks (product/collection created, changed, deleted)
+@router.post("/webhook")
+async def wix_webhook(request: Request):
+    # the body is a JWT signed by Wix, not JSON
+    token = (await request.body()).decode()
+    event_type, data = decode_wix_webhook(token)
+
+    event = parse_wix_event(event_type, data)
+    if event:
+        resource, action, wix_id = event
+        # applied after the debounce window, coalesced with later edits
+        wix_webhook_coalescer.add(resource, wix_id, action)
+    # Wix only needs a quick 200; unknown events are acknowledged and ignored
+    return {"received": bool(event)}
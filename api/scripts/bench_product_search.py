@@ -0,0 +1,127 @@
+"""
+Compare the old ilike '%name%' scan with the full-text index on /product/filter.
+
+Run from the api folder:
+    python -m scripts.bench_product_search --products 100000
+
+Ranked search has to score every match, so very frequent terms are slower
+than an ilike scan that stops after `limit` rows; selective terms are where
+the index pays off.
+"""
+import argparse
+import itertools
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from database import Base
+from models import Product, ProductAdditionalInfo
+from services.product_search import create_search_index, search_subquery
+
+
+def make_vocabulary(rng: random.Random, size: int) -> tuple[list[str], list[float]]:
+    # Zipf-like word frequencies, roughly like real product copy
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = sorted({"".join(rng.choices(letters, k=rng.randint(4, 9))) for _ in range(size)})
+    rng.shuffle(words)
+    cum_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(words) + 1)))
+    return words, cum_weights
+
+
+def seed(engine, count: int) -> list[str]:
+    rng = random.Random(42)
+    words, cum_weights = make_vocabulary(rng, 20_000)
+
+    def text_of(k: int) -> str:
+        return " ".join(rng.choices(words, cum_weights=cum_weights, k=k))
+
+    with Session(engine) as db:
+        for start in range(0, count, 10_000):
+            ids = range(start + 1, min(start + 10_000, count) + 1)
+            db.execute(
+                insert(Product),
+                [
+                    {
+                        "id": i,
+                        "wix_id": f"wix-product-{i}",
+                        "name": text_of(3),
+                        "description": text_of(60),
+                        "price": 10.0,
+                        "last_updated": datetime(2024, 1, 1) + timedelta(minutes=i),
+                    }
+                    for i in ids
+                ],
+            )
+            db.execute(
+                insert(ProductAdditionalInfo),
+                [
+                    {"product_id": i, "title": "Care", "description": text_of(10)}
+                    for i in ids
+                ],
+            )
+        db.commit()
+    return words
+
+
+def timed(label: str, fn, repeat: int):
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        hits = fn()
+    per_query = (time.perf_counter() - start) / repeat * 1000
+    print(f"{label:<40} {per_query:9.2f} ms/query  {hits:>7} hits")
+    return per_query
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    words = seed(engine, args.products)
+
+    start = time.perf_counter()
+    create_search_index(engine)
+    print(f"{args.products} products, index build {time.perf_counter() - start:.2f}s (sqlite FTS5)")
+
+    # a frequent, a mid-frequency and a rare term, as shoppers type them
+    terms = {"frequent": words[2], "medium": words[200], "rare": words[5_000]}
+
+    with Session(engine) as db:
+        for label, term in terms.items():
+
+            def ilike_name():
+                # the old /product/filter?name= query, default ordering
+                query = db.query(Product.id).filter(Product.name.ilike(f"%{term}%"))
+                return len(query.order_by(Product.last_updated.desc()).limit(args.limit).all())
+
+            def ilike_name_description():
+                query = db.query(Product.id).filter(
+                    Product.name.ilike(f"%{term}%") | Product.description.ilike(f"%{term}%")
+                )
+                return len(query.order_by(Product.last_updated.desc()).limit(args.limit).all())
+
+            def fts_ranked():
+                search = search_subquery(db, term)
+                query = db.query(Product.id).join(search, search.c.product_id == Product.id)
+                return len(query.order_by(search.c.score, Product.id).limit(args.limit).all())
+
+            print(f"-- {label} term '{term}'")
+            timed("ilike name", ilike_name, args.repeat)
+            wide = timed("ilike name + description", ilike_name_description, args.repeat)
+            fts = timed("fts ranked (name, description, info)", fts_ranked, args.repeat)
+            print(f"{'fts vs ilike name + description':<40} {wide / fts:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
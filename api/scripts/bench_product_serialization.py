@@ -0,0 +1,114 @@
+"""
+Compare how a list of ORM products becomes a JSON body:
+
+    fastapi default   validate into ProductSchema, jsonable_encoder, json.dumps
+                      (what response_model did before the catalog cache)
+    type adapter      TypeAdapter(List[ProductSchema]) validate + dump_json
+                      (the current cached path)
+    fast              plain dicts from the rows, encoded with orjson (?fast=true)
+
+Run from the api folder:
+    python -m scripts.bench_product_serialization --sizes 1000 10000 100000
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from helpers.product_serializer import dump_products
+from models import Category, Product, ProductAdditionalInfo, ProductImage
+from routers.product_pydantic import ProductSchema
+
+product_list_adapter = TypeAdapter(List[ProductSchema])
+
+
+def make_products(count: int) -> list[Product]:
+    # detached ORM objects with loaded relationships, like after selectinload
+    categories = [
+        Category(id=i, wix_id=f"wix-cat-{i}", name=f"Category {i}", description="Seasonal picks")
+        for i in range(1, 21)
+    ]
+    start = datetime(2024, 1, 1)
+    products = []
+    for i in range(1, count + 1):
+        product = Product(
+            id=i,
+            wix_id=f"wix-product-{i}",
+            name=f"Product {i}",
+            visible_in_wix=True,
+            description="Hand made ceramic mug with a glazed finish. " * 8,
+            weight=0.35,
+            price=19.9 + i % 50,
+            discounted_type="PERCENT",
+            discounted_amount=10.0,
+            discounted_price=17.91 + i % 50,
+            created_date=start,
+            last_updated=start + timedelta(minutes=i),
+        )
+        product.images = [
+            ProductImage(
+                id=i * 3 + k,
+                media_url=f"https://static.wixstatic.com/media/{i}_{k}.jpg",
+                thumbnail_url=f"https://static.wixstatic.com/media/{i}_{k}_thumb.jpg",
+            )
+            for k in range(3)
+        ]
+        product.additional_info_sections = [
+            ProductAdditionalInfo(id=i * 2 + k, title=title, description="Dishwasher safe.")
+            for k, title in enumerate(("Care", "Shipping"))
+        ]
+        product.categories = [categories[i % 20], categories[(i * 7) % 20]]
+        products.append(product)
+    return products
+
+
+def fastapi_default(products) -> bytes:
+    validated = [ProductSchema.model_validate(product) for product in products]
+    return json.dumps(jsonable_encoder(validated)).encode()
+
+
+def type_adapter(products) -> bytes:
+    return product_list_adapter.dump_json(
+        product_list_adapter.validate_python(products, from_attributes=True)
+    )
+
+
+def fast(products) -> bytes:
+    return dump_products(products)
+
+
+def timed(fn, products, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(products)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    paths = {"fastapi default": fastapi_default, "type adapter": type_adapter, "fast": fast}
+
+    for size in args.sizes:
+        products = make_products(size)
+        # the fast body must be the same JSON the schema path produces
+        assert json.loads(fast(products)) == json.loads(type_adapter(products))
+
+        print(f"-- {size} products")
+        results = {label: timed(fn, products, args.repeat) for label, fn in paths.items()}
+        for label, ms in results.items():
+            speedup = results["fastapi default"] / ms
+            print(f"{label:<20} {ms:10.1f} ms  {speedup:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Compare the old per-product sync loop with the batched upsert engine.
+
+Run from the api folder:
+    python -m scripts.bench_product_sync --products 50000
+
+The legacy loop does ~10 round trips per product, so by default it only runs
+on the first --legacy-products items and the speedup compares throughput.
+"""
+import argparse
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database import Base
+from helpers.wix_mapper import map_wix_product_to_db_model
+from models import Category, Product, ProductAdditionalInfo, ProductImage
+from services.product_sync_service import PRODUCT_FIELDS, sync_wix_product_items
+
+
+def make_wix_products(count: int, categories: int) -> list[dict]:
+    return [
+        {
+            "id": f"wix-product-{i}",
+            "name": f"Product {i}",
+            "description": f"Description of product {i}",
+            "visible": True,
+            "weight": 1.0,
+            "priceData": {"price": 10.0 + i % 500, "discountedPrice": 9.0 + i % 500},
+            "discount": {"type": "NONE", "amount": 0.0},
+            "createdDate": "2024-01-01T10:00:00.000Z",
+            "lastUpdated": "2024-06-01T10:00:00.000Z",
+            "media": {"mainMedia": {"thumbnail": {"url": f"https://static.wix/{i}.jpg"}}},
+            "collectionIds": [f"wix-cat-{i % categories}", f"wix-cat-{(i + 7) % categories}"],
+            "additionalInfoSections": [{"title": "Care", "description": "Hand wash"}],
+        }
+        for i in range(count)
+    ]
+
+
+def legacy_sync(db, items: list[dict]):
+    # the pre-batching implementation of sync_wix_products, kept for comparison
+    for item in items:
+        mapped = map_wix_product_to_db_model(item)
+        product = db.query(Product).filter_by(wix_id=mapped["wix_id"]).first()
+        if not product:
+            product = Product(wix_id=mapped["wix_id"])
+        for field in PRODUCT_FIELDS:
+            setattr(product, field, mapped[field])
+        db.add(product)
+        db.commit()
+        db.refresh(product)
+
+        db.query(ProductImage).filter_by(product_id=product.id).delete()
+        for image in mapped["images"]:
+            db.add(ProductImage(product_id=product.id, **image))
+
+        product.categories.clear()
+        for wix_cat_id in mapped.get("category_ids", []):
+            category = db.query(Category).filter_by(wix_id=wix_cat_id).first()
+            if category:
+                product.categories.append(category)
+
+        db.query(ProductAdditionalInfo).filter_by(product_id=product.id).delete()
+        for info in mapped.get("additional_info", []):
+            db.add(ProductAdditionalInfo(product_id=product.id, **info))
+
+        db.commit()
+
+
+def fresh_session(categories: int):
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, autocommit=False, autoflush=False)()
+    db.execute(
+        insert(Category),
+        [{"wix_id": f"wix-cat-{i}", "name": f"Category {i}"} for i in range(categories)],
+    )
+    db.commit()
+    return db
+
+
+def timed(label: str, fn, db, items) -> float:
+    start = time.perf_counter()
+    fn(db, items)
+    elapsed = time.perf_counter() - start
+    rate = len(items) / elapsed
+    print(f"{label:<28} {len(items):>7} {elapsed:8.2f}s  {rate:10.0f} products/s")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=50_000)
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--legacy-products", type=int, default=5_000)
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    items = make_wix_products(args.products, args.categories)
+    print(f"{args.products} products, {args.categories} categories (sqlite in-memory)")
+
+    db = fresh_session(args.categories)
+    batched_insert = timed("batched (insert)", sync_wix_product_items, db, items)
+    batched_update = timed("batched (update)", sync_wix_product_items, db, items)
+    db.close()
+
+    if args.skip_legacy:
+        return
+
+    db = fresh_session(args.categories)
+    legacy_items = items[: args.legacy_products]
+    legacy_insert = timed("legacy (insert)", legacy_sync, db, legacy_items)
+    legacy_update = timed("legacy (update)", legacy_sync, db, legacy_items)
+    db.close()
+
+    print(f"speedup insert: {batched_insert / legacy_insert:.1f}x")
+    print(f"speedup update: {batched_update / legacy_update:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Compare the old per-product Wix mapper (dateutil, mainMedia only) with the
+batch mapper used by the sync now.
+
+Run from the api folder:
+    python -m scripts.bench_wix_mapper --products 100000
+
+Also checks that every field except images maps to the same value, so the
+content hash only changes for products that gained images.
+"""
+import argparse
+import time
+import tracemalloc
+from datetime import timezone
+
+from dateutil import parser as date_parser
+
+from helpers.wix_mapper import map_wix_products
+from scripts.wix_fixture_server import synthetic_catalog
+
+
+def legacy_map(wix_product: dict) -> dict:
+    # the previous map_wix_product_to_db_model, kept for comparison
+    price_data = wix_product.get("priceData", {})
+    discount_data = wix_product.get("discount", {})
+
+    product_data = {
+        "wix_id": wix_product.get("id"),
+        "name": wix_product.get("name"),
+        "description": wix_product.get("description"),
+        "visible_in_wix": wix_product.get("visible", True),
+        "weight": wix_product.get("weight", 0.0),
+        "price": price_data.get("price", 0.0),
+        "discounted_price": price_data.get("discountedPrice", 0.0),
+        "discounted_type": discount_data.get("type"),
+        "discounted_amount": discount_data.get("amount", 0.0),
+        "created_date": date_parser.parse(wix_product.get("createdDate")),
+        "last_updated": date_parser.parse(wix_product.get("lastUpdated")),
+        "images": [],
+        "category_ids": wix_product.get("collectionIds"),
+        "additional_info": [],
+    }
+    main_media = wix_product.get("media", {}).get("mainMedia", {})
+    image_data = {
+        "media_url": main_media.get("thumbnail", {}).get("url", {}),
+        "thumbnail_url": main_media.get("thumbnail", {}).get("url", {}),
+    }
+    if image_data.get("media_url"):
+        product_data["images"].append(image_data)
+    for section in wix_product.get("additionalInfoSections", []):
+        product_data["additional_info"].append(
+            {"title": section.get("title"), "description": section.get("description")}
+        )
+    return product_data
+
+
+def legacy_batch(items: list[dict]) -> list[dict]:
+    return [legacy_map(item) for item in items]
+
+
+def batch(items: list[dict]) -> list[dict]:
+    return list(map_wix_products(items))
+
+
+def timed(fn, items, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(items)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def peak_mb(fn, items) -> float:
+    tracemalloc.start()
+    fn(items)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    items = synthetic_catalog(args.products, 50)["products"]
+
+    images = 0
+    for old, new in zip(legacy_batch(items), batch(items)):
+        # the mapper stores naive UTC; the legacy one kept the offset
+        for key in ("created_date", "last_updated"):
+            old[key] = old[key].astimezone(timezone.utc).replace(tzinfo=None)
+        assert {k: v for k, v in old.items() if k != "images"} == {
+            k: v for k, v in new.items() if k != "images"
+        }, old["wix_id"]
+        images += len(new["images"])
+    print(f"{args.products} products, {images} images (was {args.products} mainMedia thumbnails)")
+
+    legacy_ms = timed(legacy_batch, items, args.repeat)
+    batch_ms = timed(batch, items, args.repeat)
+    print(f"{'legacy':<10} {legacy_ms:10.1f} ms")
+    print(f"{'batch':<10} {batch_ms:10.1f} ms  {legacy_ms / batch_ms:6.1f}x")
+
+    # streaming: the mapped records of one page at a time, not the whole list
+    def stream(items):
+        for _ in map_wix_products(iter(items)):
+            pass
+
+    print(f"peak memory mapping to a list {peak_mb(batch, items):8.1f} MB, streamed {peak_mb(stream, items):8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
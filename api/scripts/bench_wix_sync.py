@@ -0,0 +1,288 @@
+"""
+End-to-end Wix sync throughput against the local fixture server
+(scripts.wix_fixture_server): HTTP paging, mapping, upserts, search index
+and read model, on a fresh sqlite database per run.
+
+Run from the api folder:
+    python -m scripts.bench_wix_sync --sizes 1000 10000 100000
+    python -m scripts.bench_wix_sync --save-baseline bench_wix_sync.json
+    python -m scripts.bench_wix_sync --baseline bench_wix_sync.json
+
+Per size it reports the category sync, a full product sync into an empty
+database and an incremental sync after --touch products changed: wall time,
+SQL statements, peak RSS and rows/s. With --baseline the run exits with
+status 1 when rows/s, statements or peak RSS regressed past --tolerance.
+
+Every phase runs in its own process (peak RSS is per process) and the
+fixture server in another one, so its catalog isn't counted. The client
+rate limit is raised to --wix-rate (the real 10/s would dominate at 100k)
+and the read cache is off, so every page really goes over HTTP.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+PHASES = ("categories", "products full", "products incremental")
+
+
+# -- measurement helpers ---------------------------------------------------
+
+
+def reset_peak_rss():
+    # Linux: writing 5 to clear_refs resets VmHWM, the peak RSS
+    try:
+        with open("/proc/self/clear_refs", "w") as file:
+            file.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as file:
+            for line in file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+class Measure:
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.statements = 0
+
+        def count(*_):
+            self.statements += 1
+
+        event.listen(engine, "before_cursor_execute", count)
+
+    async def run(self, phase: str, coro_fn) -> dict:
+        self.statements = 0
+        reset_peak_rss()
+        start = time.perf_counter()
+        rows = await coro_fn()
+        seconds = time.perf_counter() - start
+        return {
+            "phase": phase,
+            "rows": rows,
+            "seconds": round(seconds, 3),
+            "statements": self.statements,
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "rows_per_s": round(rows / seconds, 1) if seconds else 0.0,
+        }
+
+
+# -- child: one phase in a fresh process -------------------------------------
+
+
+def fixture_request(method: str, path: str, payload: dict | None = None) -> dict:
+    from settings import get_settings
+
+    data = json.dumps(payload).encode() if payload is not None else None
+    request = urllib.request.Request(
+        get_settings().WIX_API_BASE + path,
+        data=data,
+        method=method,
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+async def run_phase(phase: str, expected: int, touch: int) -> dict:
+    # imported here: the parent sets WIX_API_BASE/DATABASE_URL for this process
+    from sqlalchemy import func, select
+
+    from database import Base, SessionLocal, engine
+    from models import Product
+    from services.product_search import create_search_index
+    from services.product_sync_service import run_wix_category_sync, run_wix_product_sync
+    from services.sync_jobs import run_in_sync_worker, shutdown_sync_jobs
+    from services.wix_api_service import close_wix_client, start_wix_client
+
+    Base.metadata.create_all(bind=engine)
+    create_search_index(engine)
+    await start_wix_client()
+    db = SessionLocal()
+    measure = Measure(engine)
+
+    async def categories() -> int:
+        return await run_wix_category_sync(db)
+
+    async def products_full() -> int:
+        result = await run_wix_product_sync(db, full=True)
+        return result.created + result.updated + result.unchanged
+
+    async def products_incremental() -> int:
+        result = await run_wix_product_sync(db)
+        # the watermark is inclusive, so the newest unchanged product comes along
+        if result.updated < touch:
+            raise SystemExit(f"incremental sync updated {result.updated} products, expected {touch}")
+        return result.created + result.updated + result.unchanged
+
+    try:
+        if phase == "categories":
+            return await measure.run(phase, categories)
+
+        await categories()
+        if phase == "products full":
+            stats = await measure.run(phase, products_full)
+        else:
+            await products_full()
+            fixture_request("POST", "_fixture/touch", {"count": touch})
+            stats = await measure.run(phase, products_incremental)
+
+        stored = await run_in_sync_worker(lambda: db.execute(select(func.count(Product.id))).scalar())
+        if stored != expected:
+            raise SystemExit(f"{phase}: {stored} products stored, expected {expected}")
+        return stats
+    finally:
+        await run_in_sync_worker(db.close)
+        await close_wix_client()
+        shutdown_sync_jobs()
+
+
+# -- parent: servers, child processes, report ---------------------------------
+
+
+def start_fixture_server(args, products: int) -> tuple[subprocess.Popen, str]:
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "scripts.wix_fixture_server",
+            "--port", "0",
+            "--products", str(products),
+            "--categories", str(args.categories),
+            "--latency-ms", str(args.latency_ms),
+            "--throttle-rate", str(args.throttle_rate),
+            "--retry-after", str(args.retry_after),
+        ],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    line = server.stdout.readline()
+    if not line.startswith("Serving"):
+        server.kill()
+        raise SystemExit(f"fixture server failed to start: {line!r}")
+    return server, line.rsplit(" ", 1)[-1].strip()
+
+
+def run_child(args, phase: str, products: int, base_url: str, workdir: str) -> dict:
+    database = os.path.join(workdir, f"bench-{products}-{phase.replace(' ', '-')}.sqlite")
+    env = {
+        **os.environ,
+        "WIX_API_BASE": base_url,
+        "DATABASE_URL": f"sqlite:///{database}",
+        # the sync worker thread shares the session's connection
+        "DEPLOYMENT_ENVIRONMENT": "DEV",
+        "WIX_RATE_LIMIT_PER_SECOND": str(args.wix_rate),
+        "WIX_RATE_LIMIT_BURST": str(max(int(args.wix_rate), 1)),
+        "WIX_READ_CACHE_TTL_SECONDS": "0",
+    }
+    output = subprocess.run(
+        [
+            sys.executable, "-m", "scripts.bench_wix_sync",
+            "--child", phase,
+            "--sizes", str(products),
+            "--categories", str(args.categories),
+            "--touch", str(args.touch),
+        ],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if output.returncode != 0:
+        sys.stderr.write(output.stderr)
+        raise SystemExit(f"{products} / {phase} failed")
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def check_regressions(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for key, stats in results.items():
+        before = baseline.get(key)
+        if not before:
+            continue
+        if stats["rows_per_s"] < before["rows_per_s"] * (1 - tolerance):
+            regressions.append(f"{key}: {stats['rows_per_s']:.0f} rows/s, baseline {before['rows_per_s']:.0f}")
+        # statements don't depend on timing, so a small slack is enough
+        if stats["statements"] > before["statements"] * 1.05:
+            regressions.append(f"{key}: {stats['statements']} statements, baseline {before['statements']}")
+        if before["peak_rss_mb"] and stats["peak_rss_mb"] > before["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{key}: peak RSS {stats['peak_rss_mb']} MB, baseline {before['peak_rss_mb']} MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--touch", type=int, default=100, help="products changed before the incremental sync")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=0.05)
+    parser.add_argument("--wix-rate", type=float, default=1000.0, help="client rate limit (requests/s)")
+    parser.add_argument("--baseline", help="compare with a saved run and fail on regressions")
+    parser.add_argument("--save-baseline", help="write this run's results as a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="allowed slowdown/growth (0.3 = 30%%)")
+    parser.add_argument("--child", choices=PHASES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        stats = asyncio.run(run_phase(args.child, args.sizes[0], args.touch))
+        print(json.dumps(stats))
+        return
+
+    print(
+        f"latency {args.latency_ms} ms, 429 rate {args.throttle_rate}, "
+        f"client limit {args.wix_rate}/s (sqlite, fresh database per phase)"
+    )
+    print(f"{'products':>9} {'phase':<22} {'rows':>7} {'seconds':>8} {'statements':>10} {'peak RSS':>9} {'rows/s':>9}")
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for products in args.sizes:
+            for phase in PHASES:
+                # a fresh catalog per phase: the incremental run edits it
+                server, base_url = start_fixture_server(args, products)
+                try:
+                    stats = run_child(args, phase, products, base_url, workdir)
+                finally:
+                    server.terminate()
+                    server.wait()
+                results[f"{products}/{phase}"] = stats
+                print(
+                    f"{products:>9} {phase:<22} {stats['rows']:>7} {stats['seconds']:>8.2f} "
+                    f"{stats['statements']:>10} {stats['peak_rss_mb']:>6.1f} MB {stats['rows_per_s']:>9.0f}"
+                )
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"baseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = check_regressions(results, baseline, args.tolerance)
+        if regressions:
+            print("REGRESSION:", *regressions, sep="\n  ")
+            raise SystemExit(1)
+        print(f"no regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
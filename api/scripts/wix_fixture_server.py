@@ -0,0 +1,371 @@
+"""
+Local stand-in for the Wix Stores query endpoints the syncs use
+(stores-reader/v1/products/query and stores/v1/collections/query), so syncs
+can be run and benchmarked without the live API.
+
+Serves a synthetic catalog or a recorded one, with offset and keyset
+paging, the filters ($and/$or/$gt/$gte/$eq/$hasSome) and sorts the syncs
+send, optional latency and injected 429s.
+
+Run from the api folder:
+    python -m scripts.wix_fixture_server --products 10000 --port 8765
+    python -m scripts.wix_fixture_server --fixture wix_catalog.json --latency-ms 80 --throttle-rate 0.05
+
+Record the live catalog once (uses the Wix credentials from .env):
+    python -m scripts.wix_fixture_server --record wix_catalog.json
+
+Then point the app at it:
+    WIX_API_BASE=http://127.0.0.1:8765/
+
+Two extra endpoints for benchmarks:
+    POST /_fixture/touch {"count": 100}   bump lastUpdated/price of 100 products
+    GET  /_fixture/stats                  requests served, 429s injected
+"""
+import argparse
+import asyncio
+import random
+import threading
+import time
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import orjson
+
+PRODUCT_ENDPOINTS = ("stores-reader/v1/products/query", "stores/v1/products/query")
+COLLECTIONS_ENDPOINT = "stores/v1/collections/query"
+MAX_PAGE_SIZE = 100
+
+
+def wix_timestamp(value: datetime) -> str:
+    return value.astimezone(timezone.utc).replace(tzinfo=None).isoformat(timespec="milliseconds") + "Z"
+
+
+def synthetic_catalog(products: int, categories: int, seed: int = 42) -> dict:
+    """A catalog shaped like Wix Stores v1 responses, with distinct lastUpdated values."""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    collections = [
+        {"id": f"wix-cat-{i}", "name": f"Category {i}", "description": "Seasonal picks", "visible": True}
+        for i in range(categories)
+    ]
+    items = []
+    for i in range(products):
+        price = round(rng.uniform(5, 500), 2)
+        images = [
+            {
+                "id": f"{i}_{k}",
+                "mediaType": "image",
+                "image": {"url": f"https://static.wixstatic.com/media/{i}_{k}.jpg", "width": 1000, "height": 1000},
+                "thumbnail": {"url": f"https://static.wixstatic.com/media/{i}_{k}_thumb.jpg", "width": 50, "height": 50},
+            }
+            for k in range(rng.randint(1, 4))
+        ]
+        items.append(
+            {
+                "id": f"wix-product-{i}",
+                "name": f"Product {i}",
+                "description": "<p>Hand made ceramic mug with a glazed finish.</p>" * rng.randint(1, 6),
+                "visible": True,
+                "weight": round(rng.uniform(0.1, 3), 2),
+                "priceData": {"currency": "EUR", "price": price, "discountedPrice": price},
+                "discount": {"type": "NONE", "value": 0},
+                "createdDate": wix_timestamp(start + timedelta(seconds=i)),
+                "lastUpdated": wix_timestamp(start + timedelta(seconds=i, milliseconds=rng.randint(0, 999))),
+                "media": {"mainMedia": images[0], "items": images},
+                "collectionIds": [f"wix-cat-{i % categories}", f"wix-cat-{(i * 7) % categories}"]
+                if categories
+                else [],
+                "additionalInfoSections": [{"title": "Care", "description": "Dishwasher safe."}],
+            }
+        )
+    return {"products": items, "collections": collections}
+
+
+def _parse_json_field(value):
+    # Wix takes filter/sort as JSON strings, but objects work as well
+    if isinstance(value, str):
+        return orjson.loads(value) if value else None
+    return value
+
+
+def _matches(item: dict, conditions: dict) -> bool:
+    for field, condition in conditions.items():
+        if field == "$and":
+            if not all(_matches(item, part) for part in condition):
+                return False
+            continue
+        if field == "$or":
+            if not any(_matches(item, part) for part in condition):
+                return False
+            continue
+        value = item.get(field)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for operator, operand in condition.items():
+            if operator == "$eq" and value != operand:
+                return False
+            if operator in ("$hasSome", "$in") and value not in operand:
+                return False
+            # Wix timestamps share one format, so strings compare in time order
+            if operator == "$gte" and (value is None or value < operand):
+                return False
+            if operator == "$gt" and (value is None or value <= operand):
+                return False
+            if operator == "$lte" and (value is None or value > operand):
+                return False
+            if operator == "$lt" and (value is None or value >= operand):
+                return False
+    return True
+
+
+def _keyset_cursor(condition, fields: tuple[str, ...]) -> tuple | None:
+    """Cursor values if `condition` is 'after (v1, v2, ..)' on `fields`, else None."""
+    if not isinstance(condition, dict):
+        return None
+    field = fields[0]
+    if len(fields) == 1:
+        operand = condition.get(field)
+        if list(condition) == [field] and isinstance(operand, dict) and list(operand) == ["$gt"]:
+            return (operand["$gt"],)
+        return None
+    parts = condition.get("$or")
+    if list(condition) != ["$or"] or len(parts) != 2:
+        return None
+    first = _keyset_cursor(parts[0], (field,))
+    tail = parts[1].get("$and") if isinstance(parts[1], dict) else None
+    if first is None or not tail or len(tail) != 2 or tail[0] != {field: {"$eq": first[0]}}:
+        return None
+    rest = _keyset_cursor(tail[1], fields[1:])
+    return None if rest is None else first + rest
+
+
+class WixFixture:
+    """Catalog state and query logic, independent of the HTTP layer."""
+
+    def __init__(
+        self,
+        catalog: dict,
+        latency: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: float = 0.2,
+        seed: int = 0,
+    ):
+        self.products: list[dict] = catalog.get("products", [])
+        self.collections: list[dict] = catalog.get("collections", [])
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        # filtered + sorted listings (and their sort keys) per query, dropped
+        # when the catalog changes
+        self._listings: dict[tuple, tuple[list[dict], list[tuple]]] = {}
+        self.requests = 0
+        self.throttled = 0
+
+    def should_throttle(self) -> bool:
+        with self._lock:
+            self.requests += 1
+            if self.throttle_rate and self._rng.random() < self.throttle_rate:
+                self.throttled += 1
+                return True
+        return False
+
+    def _sorted(self, resource: str, filter_, sort) -> tuple[list[dict], list[tuple]]:
+        key = (resource, orjson.dumps(filter_, option=orjson.OPT_SORT_KEYS), orjson.dumps(sort))
+        with self._lock:
+            cached = self._listings.get(key)
+            if cached is not None:
+                return cached
+
+            items = self.products if resource == "products" else self.collections
+            if filter_:
+                items = [item for item in items if _matches(item, filter_)]
+            fields = [next(iter(order)) for order in sort or []]
+            for order in reversed(sort or []):
+                ((field, direction),) = order.items()
+                items = sorted(items, key=lambda item: item.get(field) or "", reverse=direction == "desc")
+            sort_keys = [tuple(item.get(field) or "" for field in fields) for item in items]
+            self._listings[key] = (items, sort_keys)
+            return items, sort_keys
+
+    def _listing(self, resource: str, query: dict) -> tuple[list[dict], int]:
+        """Matching rows in sort order, and where the page's rows start."""
+        filter_ = _parse_json_field(query.get("filter"))
+        sort = _parse_json_field(query.get("sort")) or []
+        fields = tuple(next(iter(order)) for order in sort)
+
+        # keyset pages: serve the cursor condition by bisecting the sorted
+        # listing of the base filter instead of filtering the whole catalog
+        cursor = None
+        if fields and all(direction == "asc" for order in sort for direction in order.values()):
+            cursor = _keyset_cursor(filter_, fields)
+            if cursor is not None:
+                filter_ = None
+            elif isinstance(filter_, dict) and list(filter_) == ["$and"] and len(filter_["$and"]) == 2:
+                cursor = _keyset_cursor(filter_["$and"][1], fields)
+                if cursor is not None:
+                    filter_ = filter_["$and"][0]
+
+        items, sort_keys = self._sorted(resource, filter_, sort)
+        start = bisect_right(sort_keys, cursor) if cursor is not None else 0
+        return items, start
+
+    def query(self, resource: str, body: dict) -> dict:
+        query = body.get("query") or {}
+        paging = query.get("paging") or {}
+        limit = min(int(paging.get("limit", MAX_PAGE_SIZE)), MAX_PAGE_SIZE)
+        offset = int(paging.get("offset", 0))
+
+        items, start = self._listing(resource, query)
+        page = items[start + offset : start + offset + limit]
+        return {
+            resource: page,
+            "metadata": {"items": len(page), "offset": offset},
+            "totalResults": len(items) - start,
+        }
+
+    def touch(self, count: int) -> int:
+        """Edit `count` products spread over the catalog, as a merchant would."""
+        with self._lock:
+            if not self.products:
+                return 0
+            step = max(len(self.products) // max(count, 1), 1)
+            now = wix_timestamp(datetime.now(timezone.utc))
+            touched = self.products[::step][:count]
+            for item in touched:
+                item["lastUpdated"] = now
+                item["priceData"] = {**item["priceData"], "price": item["priceData"]["price"] + 1}
+            self._listings.clear()
+            return len(touched)
+
+    def stats(self) -> dict:
+        return {
+            "products": len(self.products),
+            "collections": len(self.collections),
+            "requests": self.requests,
+            "throttled": self.throttled,
+        }
+
+
+def make_handler(fixture: WixFixture):
+    class WixFixtureHandler(BaseHTTPRequestHandler):
+        # keep-alive, like the real API, so the pooled client reuses connections
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status: int, payload: dict, headers: dict | None = None):
+            body = orjson.dumps(payload)
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _read_body(self) -> dict:
+            length = int(self.headers.get("Content-Length") or 0)
+            return orjson.loads(self.rfile.read(length)) if length else {}
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/_fixture/stats":
+                return self._send(200, fixture.stats())
+            self._send(404, {"message": f"Unknown endpoint {self.path}"})
+
+        def do_POST(self):
+            path = self.path.split("?", 1)[0].strip("/")
+            body = self._read_body()
+            if path == "_fixture/touch":
+                return self._send(200, {"touched": fixture.touch(int(body.get("count", 1)))})
+
+            if path in PRODUCT_ENDPOINTS:
+                resource = "products"
+            elif path == COLLECTIONS_ENDPOINT:
+                resource = "collections"
+            else:
+                return self._send(404, {"message": f"Unknown endpoint {path}"})
+
+            if fixture.latency:
+                time.sleep(fixture.latency)
+            if fixture.should_throttle():
+                return self._send(
+                    429,
+                    {"message": "Too many requests"},
+                    {"Retry-After": f"{fixture.retry_after:g}"},
+                )
+            self._send(200, fixture.query(resource, body))
+
+        def log_message(self, format, *args):
+            pass
+
+    return WixFixtureHandler
+
+
+def serve(fixture: WixFixture, host: str, port: int):
+    server = ThreadingHTTPServer((host, port), make_handler(fixture))
+    server.daemon_threads = True
+    host, port = server.server_address[:2]
+    # first line of output, parsed by scripts.bench_wix_sync
+    print(f"Serving {len(fixture.products)} products, {len(fixture.collections)} collections on http://{host}:{port}/", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+async def record_catalog() -> dict:
+    from services.wix_api_service import close_wix_client, wix_query_pages
+
+    catalog = {"products": [], "collections": []}
+    try:
+        async for page in wix_query_pages(PRODUCT_ENDPOINTS[0], "products"):
+            catalog["products"].extend(page)
+        async for page in wix_query_pages(COLLECTIONS_ENDPOINT, "collections"):
+            catalog["collections"].extend(page)
+    finally:
+        await close_wix_client()
+    return catalog
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765, help="0 picks a free port")
+    parser.add_argument("--fixture", help="serve a recorded catalog instead of a synthetic one")
+    parser.add_argument("--products", type=int, default=1_000)
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="added to every query")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="share of queries answered with 429")
+    parser.add_argument("--retry-after", type=float, default=0.2, help="Retry-After of injected 429s (seconds)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--record", metavar="OUT", help="save the live Wix catalog to OUT and exit")
+    args = parser.parse_args()
+
+    if args.record:
+        catalog = asyncio.run(record_catalog())
+        with open(args.record, "wb") as file:
+            file.write(orjson.dumps(catalog))
+        print(f"Recorded {len(catalog['products'])} products, {len(catalog['collections'])} collections to {args.record}")
+        return
+
+    if args.fixture:
+        with open(args.fixture, "rb") as file:
+            catalog = orjson.loads(file.read())
+    else:
+        catalog = synthetic_catalog(args.products, args.categories)
+
+    fixture = WixFixture(
+        catalog,
+        latency=args.latency_ms / 1000,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+    serve(fixture, args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
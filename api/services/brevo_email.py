@@ -1,12 +1,94 @@
 import httpx
+from dataclasses import dataclass
 from typing import Any, Optional
-from dependencies.deps import BREVO_SENDER_EMAIL, BREVO_SENDER_NAME, BREVO_API_KEY, BREVO_API_URL 
+from dependencies.deps import BREVO_SENDER_EMAIL, BREVO_SENDER_NAME, BREVO_API_KEY, BREVO_API_URL
+from settings import get_settings
 
+settings = get_settings()
 
 
+HEADERS = {
+    "api-key": BREVO_API_KEY,
+    "accept": "application/json",
+    "content-type": "application/json",
+}
+
+SENDER = {
+    "email": BREVO_SENDER_EMAIL,
+    "name": BREVO_SENDER_NAME,
+}
+
+
+# One pooled client per worker, like the Wix client: every mail reuses an
+# open connection instead of a new TCP + TLS handshake
+_client: httpx.AsyncClient | None = None
+
 
 class BrevoEmailError(Exception):
-    pass
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@dataclass
+class BrevoMessage:
+    """One recipient of a batch send: a message version of the template."""
+    to_email: str
+    to_name: Optional[str]
+    params: dict[str, Any]
+
+
+def create_brevo_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        headers=HEADERS,
+        timeout=settings.BREVO_TIMEOUT_SECONDS,
+        limits=httpx.Limits(
+            max_connections=settings.BREVO_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.BREVO_HTTP_MAX_CONNECTIONS,
+            keepalive_expiry=settings.BREVO_HTTP_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+async def start_brevo_client():
+    global _client
+    if _client is None:
+        _client = create_brevo_client()
+
+
+async def close_brevo_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_brevo_client() -> httpx.AsyncClient:
+    # lazy fallback for code running outside the app lifespan (scripts)
+    global _client
+    if _client is None:
+        _client = create_brevo_client()
+    return _client
+
+
+def _recipient(email: str, name: Optional[str]) -> dict[str, str]:
+    return {"email": email, **({"name": name} if name else {})}
+
+
+async def _post_email(payload: dict[str, Any]) -> dict[str, Any]:
+    resp = await get_brevo_client().post(BREVO_API_URL, json=payload)
+
+    if resp.status_code >= 400:
+        # Brevo returns useful JSON errors; expose it for debugging/logging
+        try:
+            detail = resp.json()
+        except Exception:
+            detail = resp.text
+
+        raise BrevoEmailError(f"Brevo send failed ({resp.status_code}): {detail}", resp.status_code)
+
+    return resp.json()
+
 
 async def send_brevo_template_email(
     to_email: str,
@@ -16,36 +98,41 @@ async def send_brevo_template_email(
 ) -> dict[str, Any]:
 
     payload: dict[str, Any] = {
-        "sender": {
-            "email": BREVO_SENDER_EMAIL,
-            "name": BREVO_SENDER_NAME,
-        },
-        "to": [
-            {
-                "email": to_email,
-                **({"name": to_name} if to_name else {}),
-            }
-        ],
+        "sender": SENDER,
+        "to": [_recipient(to_email, to_name)],
         "templateId": template_id,
         "params": params,
     }
+    return await _post_email(payload)
 
-    headers = {
-        "api-key": BREVO_API_KEY,
-        "accept": "application/json",
-        "content-type": "application/json",
-    }
 
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        resp = await client.post(BREVO_API_URL, json=payload, headers=headers)
-
-    if resp.status_code >= 400:
-        # Brevo returns useful JSON errors; expose it for debugging/logging
-        try:
-            detail = resp.json()
-        except Exception:
-            detail = resp.text
+async def send_brevo_template_batch(
+    template_id: int,
+    messages: list[BrevoMessage],
+) -> list[Optional[str]]:
+    """
+    Send one template to many recipients in a single call, each with its
+    own params (Brevo messageVersions). Returns the messageIds in the order
+    of `messages`. Brevo accepts or rejects the call as a whole, so a
+    BrevoEmailError means none of them was sent.
+    """
+    if not messages:
+        return []
+    if len(messages) > settings.BREVO_BATCH_MAX_VERSIONS:
+        raise ValueError(f"At most {settings.BREVO_BATCH_MAX_VERSIONS} messages per Brevo batch")
 
-        raise BrevoEmailError(f"Brevo send failed ({resp.status_code}): {detail}")
+    payload: dict[str, Any] = {
+        "sender": SENDER,
+        "templateId": template_id,
+        "messageVersions": [
+            {"to": [_recipient(message.to_email, message.to_name)], "params": message.params}
+            for message in messages
+        ],
+    }
+    response = await _post_email(payload)
 
-    return resp.json()
+    message_ids = response.get("messageIds") or []
+    if len(message_ids) != len(messages):
+        # sent, but ids we can't pair with recipients
+        return [None] * len(messages)
+    return list(message_ids)
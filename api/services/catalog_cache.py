@@ -0,0 +1,130 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from models import Product, SyncState
+from settings import get_settings
+
+settings = get_settings()
+
+CATALOG_SOURCE = "catalog"
+
+
+@dataclass
+class CacheEntry:
+    body: bytes
+    headers: dict[str, str]
+
+
+class CatalogCache:
+    """
+    LRU cache of serialized catalog responses, bounded by entry count and
+    total body size. Entries belong to one catalog version; bumping the
+    version (after a sync) drops everything.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.version = 0
+        self._entries: OrderedDict[tuple, CacheEntry] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(endpoint: str, params) -> tuple:
+        # normalized: order-independent, empty values dropped
+        return (endpoint, tuple(sorted((k, v) for k, v in params.multi_items() if v != "")))
+
+    def get(self, key: tuple) -> CacheEntry | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: tuple, entry: CacheEntry, version: int):
+        size = len(entry.body)
+        with self._lock:
+            # built from data older than the last sync, or too big to keep
+            if version != self.version or size > self.max_bytes:
+                return
+
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old.body)
+            self._entries[key] = entry
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.body)
+                self.evictions += 1
+
+    def bump_version(self):
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "version": self.version,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+catalog_cache = CatalogCache(
+    max_entries=settings.CATALOG_CACHE_MAX_ENTRIES,
+    max_bytes=settings.CATALOG_CACHE_MAX_MB * 1024 * 1024,
+)
+
+
+def read_catalog_version(db: Session) -> str:
+    """
+    Version of the catalog as stored in the DB, shared by all workers:
+    sync generation + newest Product.last_updated (one indexed query).
+    """
+    generation = (
+        select(SyncState.generation)
+        .where(SyncState.source == CATALOG_SOURCE)
+        .scalar_subquery()
+    )
+    newest = select(func.max(Product.last_updated)).scalar_subquery()
+    generation, newest = db.execute(select(generation, newest)).one()
+    return f"{generation or 0}:{newest.isoformat() if newest else ''}"
+
+
+def mark_catalog_changed(db: Session):
+    """Bump the shared sync generation and drop this worker's cached responses."""
+    bumped = db.execute(
+        update(SyncState)
+        .where(SyncState.source == CATALOG_SOURCE)
+        .values(generation=SyncState.generation + 1)
+    )
+    if not bumped.rowcount:
+        db.add(SyncState(source=CATALOG_SOURCE, generation=1))
+    db.commit()
+    catalog_cache.bump_version()
+
+
+def make_etag(catalog_version: str, key: tuple) -> str:
+    digest = hashlib.sha1(repr((catalog_version, key)).encode()).hexdigest()
+    return f'"{digest}"'
@@ -0,0 +1,70 @@
+import csv
+import io
+from typing import Iterator
+
+from sqlalchemy import select
+
+from database import SessionLocal
+from models import Product
+from services.product_read_model import rendered_documents
+
+EXPORT_CHUNK_SIZE = 1000
+
+# flat product columns for the CSV export (nested data stays in NDJSON)
+CSV_COLUMNS = (
+    "id",
+    "wix_id",
+    "name",
+    "visible_in_wix",
+    "description",
+    "weight",
+    "price",
+    "discounted_type",
+    "discounted_amount",
+    "discounted_price",
+    "created_date",
+    "last_updated",
+)
+
+
+def _stream_rows(statement, chunk_size: int) -> Iterator[list]:
+    """
+    Yield result rows in chunks of `chunk_size` from a server-side cursor.
+    Owns its session: the request's session is closed before a streaming
+    body is sent.
+    """
+    db = SessionLocal()
+    try:
+        result = db.execute(statement.execution_options(yield_per=chunk_size))
+        yield from result.partitions()
+    finally:
+        db.close()
+
+
+def iter_ndjson(chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    # one pre-rendered ProductSchema document per line, straight from the read model
+    statement = select(Product.id, Product.rendered_json).order_by(Product.id)
+    # renders the products that have no document yet
+    with SessionLocal() as db:
+        for rows in _stream_rows(statement, chunk_size):
+            yield "".join(f"{document}\n" for document in rendered_documents(db, rows)).encode()
+
+
+def iter_csv(chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush() -> bytes:
+        data = buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    # header goes out before the first query so the client gets bytes right away
+    writer.writerow(CSV_COLUMNS)
+    yield flush()
+
+    statement = select(*(getattr(Product, column) for column in CSV_COLUMNS)).order_by(Product.id)
+    for rows in _stream_rows(statement, chunk_size):
+        writer.writerows(rows)
+        yield flush()
@@ -0,0 +1,295 @@
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from typing import Iterator
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import Product, ProductCategory
+from services.catalog_cache import read_catalog_version
+from settings import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def _to_micros(value: datetime) -> int:
+    return (value.replace(tzinfo=None) - EPOCH) // timedelta(microseconds=1)
+
+
+def _from_micros(value: int) -> datetime:
+    return EPOCH + timedelta(microseconds=value)
+
+
+class SortedColumn:
+    """
+    One sortable product column as parallel arrays sorted by (value, id).
+    NULLs are kept apart and sort after every value, like keyset_order.
+
+    Positions run over the ascending order: 0..n-1 are the values, n.. the
+    NULL rows; a descending scan walks the same positions backwards.
+    """
+
+    def __init__(self, rows: list[tuple], typecode: str, max_id: int, encode=None, decode=None):
+        self.encode = encode
+        self.decode = decode
+        present = sorted(
+            (encode(value) if encode else value, product_id)
+            for value, product_id in rows
+            if value is not None
+        )
+        self.values = array(typecode, (value for value, _ in present))
+        self.ids = array("q", (product_id for _, product_id in present))
+        self.null_ids = array("q", sorted(product_id for value, product_id in rows if value is None))
+
+        # product id -> position, for filtering/sorting an arbitrary id set
+        self.rank = array("q", [-1]) * (max_id + 1)
+        for position, product_id in enumerate(self.ids):
+            self.rank[product_id] = position
+        for offset, product_id in enumerate(self.null_ids):
+            self.rank[product_id] = len(self.ids) + offset
+
+    def __len__(self) -> int:
+        return len(self.ids) + len(self.null_ids)
+
+    def id_at(self, position: int) -> int:
+        if position < len(self.ids):
+            return self.ids[position]
+        return self.null_ids[position - len(self.ids)]
+
+    def value_of(self, product_id: int):
+        """Cursor value of a product (datetime for timestamp columns)."""
+        position = self.rank[product_id]
+        if position >= len(self.ids):
+            return None
+        value = self.values[position]
+        return self.decode(value) if self.decode else value
+
+    def in_range(self, product_id: int, low, high) -> bool:
+        position = self.rank[product_id]
+        if position >= len(self.ids):
+            return False  # NULL never matches a bound
+        value = self.values[position]
+        return (low is None or value >= low) and (high is None or value <= high)
+
+    def range_positions(self, low, high) -> tuple[int, int]:
+        # bounds exclude NULLs, as price >= x does in SQL
+        if low is None and high is None:
+            return 0, len(self)
+        start = 0 if low is None else bisect_left(self.values, low)
+        end = len(self.ids) if high is None else bisect_right(self.values, high)
+        return start, end
+
+    def position_after(self, value, product_id: int, descending: bool) -> int:
+        """First position to scan after the cursor row, in scan direction."""
+        if value is None:
+            start, end, ids, offset = 0, len(self.null_ids), self.null_ids, len(self.ids)
+        else:
+            if self.encode:
+                value = self.encode(value)
+            start = bisect_left(self.values, value)
+            end = bisect_right(self.values, value)
+            ids, offset = self.ids, 0
+        if descending:
+            return offset + bisect_left(ids, product_id, start, end) - 1
+        return offset + bisect_right(ids, product_id, start, end)
+
+
+class CatalogIndex:
+    """
+    Immutable in-memory snapshot of what /product/filter needs to filter and
+    sort without SQL: price, last_updated and id columns plus the product ids
+    of each category. Built for one catalog version.
+    """
+
+    def __init__(self, version: str, products: list[tuple], links: list[tuple]):
+        self.version = version
+        max_id = max((product_id for product_id, _, _ in products), default=0)
+        self.columns = {
+            "price": SortedColumn(
+                [(price, product_id) for product_id, price, _ in products], "d", max_id
+            ),
+            "last_updated": SortedColumn(
+                [(last_updated, product_id) for product_id, _, last_updated in products],
+                "q",
+                max_id,
+                encode=_to_micros,
+                decode=_from_micros,
+            ),
+            "id": SortedColumn([(product_id, product_id) for product_id, _, _ in products], "q", max_id),
+        }
+        categories: dict[int, set[int]] = {}
+        for product_id, category_id in links:
+            categories.setdefault(category_id, set()).add(product_id)
+        self.categories = {category_id: frozenset(ids) for category_id, ids in categories.items()}
+
+    def supports(self, order_by: str) -> bool:
+        return order_by in self.columns
+
+    def _scan(self, column: SortedColumn, start: int, end: int, descending: bool) -> Iterator[int]:
+        positions = range(end - 1, start - 1, -1) if descending else range(start, end)
+        for position in positions:
+            yield column.id_at(position)
+
+    def page(
+        self,
+        order_by: str,
+        descending: bool,
+        limit: int | None,
+        after: tuple | None = None,
+        min_price: float | None = None,
+        max_price: float | None = None,
+        category_id: int | None = None,
+    ) -> tuple[list[int], bool]:
+        """
+        Product ids of one page in (order_by, id) keyset order, and whether
+        more rows follow. `after` is the decoded (value, id) cursor.
+        """
+        column = self.columns[order_by]
+        price = self.columns["price"]
+        # sorting by price already narrows the scan to the price range
+        price_bounded = order_by != "price" and (min_price is not None or max_price is not None)
+
+        start, end = 0, len(column)
+        if order_by == "price":
+            start, end = column.range_positions(min_price, max_price)
+        if after is not None:
+            position = column.position_after(*after, descending)
+            if descending:
+                end = min(end, position + 1)
+            else:
+                start = max(start, position)
+
+        members = None
+        if category_id is not None:
+            members = self.categories.get(category_id, frozenset())
+
+        def matches(product_id: int) -> bool:
+            if members is not None and product_id not in members:
+                return False
+            return not price_bounded or price.in_range(product_id, min_price, max_price)
+
+        # Filters that can hand over their ids directly: the category's set
+        # and, when sorting by another column, the price range
+        sources = []
+        if members is not None:
+            sources.append((len(members), lambda: members))
+        if price_bounded:
+            low, high = price.range_positions(min_price, max_price)
+            sources.append((high - low, lambda: price.ids[low:high]))
+
+        wanted = None if limit is None else limit + 1
+        span = end - start
+        selectivity = 1.0
+        for size, _ in sources:
+            selectivity *= size / max(len(column), 1)
+        # rows a scan in sort order visits before the page is full
+        scan_cost = span if wanted is None or not selectivity else min(span, wanted / selectivity)
+
+        if sources and min(size for size, _ in sources) < scan_cost:
+            # selective filter: take its ids, filter, then sort them by rank
+            _, source = min(sources, key=lambda item: item[0])
+            ranked = sorted(
+                column.rank[product_id]
+                for product_id in source()
+                if start <= column.rank[product_id] < end and matches(product_id)
+            )
+            if descending:
+                ranked.reverse()
+            ids = [column.id_at(position) for position in ranked[:wanted]]
+        else:
+            ids = []
+            for product_id in self._scan(column, start, end, descending):
+                if not matches(product_id):
+                    continue
+                ids.append(product_id)
+                if wanted is not None and len(ids) >= wanted:
+                    break
+
+        if limit is not None and len(ids) > limit:
+            return ids[:limit], True
+        return ids, False
+
+
+def build_catalog_index(db: Session) -> CatalogIndex | None:
+    """Snapshot the catalog; None if it changed while being read."""
+    version = read_catalog_version(db)
+    products = db.execute(select(Product.id, Product.price, Product.last_updated)).all()
+    links = db.execute(select(ProductCategory.c.product_id, ProductCategory.c.category_id)).all()
+    if read_catalog_version(db) != version:
+        return None
+    return CatalogIndex(version, products, links)
+
+
+class CatalogIndexHolder:
+    """
+    Holds the current CatalogIndex. Swapping the reference is atomic, so
+    readers always see a complete index; a stale one is never served.
+    """
+
+    def __init__(self, enabled: bool, min_rebuild_seconds: float):
+        self.enabled = enabled
+        self.min_rebuild_seconds = min_rebuild_seconds
+        self.index: CatalogIndex | None = None
+        self._rebuilding = threading.Lock()
+        self._last_build = float("-inf")
+
+    def lookup(self, version: str) -> CatalogIndex | None:
+        """Index for `version`, or None (caller falls back to SQL)."""
+        if not self.enabled:
+            return None
+        index = self.index
+        if index is not None and index.version == version:
+            return index
+        # stale or missing (e.g. another worker synced): rebuild in the
+        # background. During a sync the version changes on every batch, so
+        # at most one rebuild per interval, and only one at a time
+        recent = time.monotonic() - self._last_build < self.min_rebuild_seconds
+        if not recent and self._rebuilding.acquire(blocking=False):
+            try:
+                threading.Thread(target=self._rebuild_in_background, daemon=True).start()
+            except Exception:
+                self._rebuilding.release()
+                raise
+        return None
+
+    def refresh(self, db: Session):
+        if not self.enabled:
+            return
+        with self._rebuilding:
+            self._build(db)
+
+    def _build(self, db: Session):
+        self._last_build = time.monotonic()
+        index = build_catalog_index(db)
+        if index is not None:
+            self.index = index
+
+    def _rebuild_in_background(self):
+        # runs with _rebuilding held by lookup
+        db = SessionLocal()
+        try:
+            self._build(db)
+        except Exception:
+            logger.exception("Catalog index rebuild failed")
+        finally:
+            db.close()
+            self._rebuilding.release()
+
+
+catalog_index = CatalogIndexHolder(
+    enabled=settings.CATALOG_INDEX_ENABLED,
+    min_rebuild_seconds=settings.CATALOG_INDEX_MIN_REBUILD_SECONDS,
+)
+
+
+def refresh_catalog_index(db: Session):
+    """Rebuild the index right after a sync (no-op when disabled)."""
+    catalog_index.refresh(db)
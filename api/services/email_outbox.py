@@ -0,0 +1,314 @@
+import asyncio
+import logging
+import random
+import secrets
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Optional
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import EmailOutbox
+from services.brevo_email import (
+    BrevoEmailError,
+    BrevoMessage,
+    send_brevo_template_batch,
+    send_brevo_template_email,
+)
+from settings import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OutboxMessage:
+    id: int
+    to_email: str
+    to_name: Optional[str]
+    template_id: int
+    params: dict[str, Any]
+    attempts: int
+    claim_token: str
+
+
+# (message, Brevo response, error) of one delivery attempt
+Outcome = tuple[OutboxMessage, Optional[dict], Optional[Exception]]
+
+
+def enqueue_email(
+    db: Session,
+    to_email: str,
+    to_name: Optional[str],
+    template_id: int,
+    params: dict[str, Any],
+) -> EmailOutbox:
+    """
+    Add a mail to the outbox in the caller's transaction. Nothing is sent
+    before that transaction commits, and a rollback drops the mail too.
+    """
+    email = EmailOutbox(to_email=to_email, to_name=to_name, template_id=template_id, params=params)
+    db.add(email)
+    return email
+
+
+def is_transient(error: Exception) -> bool:
+    # Brevo rejected the mail itself (bad address, template): retrying won't help
+    if isinstance(error, BrevoEmailError) and error.status_code is not None:
+        return error.status_code == 429 or error.status_code >= 500
+    return True  # timeouts, connection errors
+
+
+def backoff_delay(attempts: int) -> float:
+    delay = min(
+        settings.EMAIL_OUTBOX_BACKOFF_MAX_SECONDS,
+        settings.EMAIL_OUTBOX_BACKOFF_BASE_SECONDS * 2 ** (attempts - 1),
+    )
+    # jitter, so mails that failed together don't retry together
+    return random.uniform(delay / 2, delay)
+
+
+def claim_due_emails(limit: int, claim_seconds: float) -> list[OutboxMessage]:
+    """
+    Claim up to `limit` due mails for this dispatcher. The conditional UPDATE
+    hands each row to one dispatcher only, also across workers; a claim that
+    is never released (worker died mid-send) expires and the mail is retried.
+    """
+    now = datetime.now(timezone.utc)
+    token = secrets.token_hex(16)
+    due = (EmailOutbox.status.in_(("pending", "sending")), EmailOutbox.next_attempt_at <= now)
+
+    with SessionLocal() as db:
+        ids = db.scalars(
+            select(EmailOutbox.id)
+            .where(*due)
+            .order_by(EmailOutbox.next_attempt_at, EmailOutbox.id)
+            .limit(limit)
+        ).all()
+        if not ids:
+            return []
+
+        db.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id.in_(ids), *due)
+            .values(
+                status="sending",
+                claim_token=token,
+                next_attempt_at=now + timedelta(seconds=claim_seconds),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+
+        rows = db.execute(
+            select(
+                EmailOutbox.id,
+                EmailOutbox.to_email,
+                EmailOutbox.to_name,
+                EmailOutbox.template_id,
+                EmailOutbox.params,
+                EmailOutbox.attempts,
+            ).where(EmailOutbox.claim_token == token)
+        ).all()
+    return [OutboxMessage(*row, claim_token=token) for row in rows]
+
+
+RECORD_DELIVERY = (
+    update(EmailOutbox.__table__)
+    .where(
+        EmailOutbox.__table__.c.id == bindparam("b_id"),
+        # a claim that expired meanwhile belongs to another dispatcher now
+        EmailOutbox.__table__.c.claim_token == bindparam("b_claim_token"),
+    )
+    .values(
+        status=bindparam("status"),
+        attempts=bindparam("attempts"),
+        next_attempt_at=bindparam("next_attempt_at"),
+        last_error=bindparam("last_error"),
+        provider_message_id=bindparam("provider_message_id"),
+        sent_at=bindparam("sent_at"),
+        claim_token=None,
+    )
+)
+
+
+def record_deliveries(
+    outcomes: list[Outcome],
+    max_attempts: int,
+) -> dict[str, int]:
+    """Store the result of one batch in one statement. Returns counts per status."""
+    now = datetime.now(timezone.utc)
+    rows = []
+    counts = {"sent": 0, "pending": 0, "failed": 0}
+    for message, response, error in outcomes:
+        row = {
+            "b_id": message.id,
+            "b_claim_token": message.claim_token,
+            "attempts": message.attempts + 1,
+            "next_attempt_at": now,
+            "last_error": None,
+            "provider_message_id": None,
+            "sent_at": None,
+        }
+        if error is None:
+            row.update(status="sent", sent_at=now, provider_message_id=(response or {}).get("messageId"))
+        elif is_transient(error) and message.attempts + 1 < max_attempts:
+            delay = backoff_delay(message.attempts + 1)
+            row.update(status="pending", next_attempt_at=now + timedelta(seconds=delay), last_error=str(error)[:2000])
+            logger.warning("Email %s to %s failed, retrying in %.0fs: %s", message.id, message.to_email, delay, error)
+        else:
+            row.update(status="failed", last_error=str(error)[:2000])
+            logger.error("Email %s to %s failed for good: %s", message.id, message.to_email, error)
+        counts[row["status"]] += 1
+        rows.append(row)
+
+    with SessionLocal() as db:
+        db.execute(RECORD_DELIVERY, rows)
+        db.commit()
+    return counts
+
+
+def _is_rejected(error: Exception) -> bool:
+    return isinstance(error, BrevoEmailError) and not is_transient(error)
+
+
+async def _send_one(message: OutboxMessage) -> Outcome:
+    try:
+        response = await send_brevo_template_email(
+            to_email=message.to_email,
+            to_name=message.to_name,
+            template_id=message.template_id,
+            params=message.params,
+        )
+        return message, response, None
+    except Exception as exc:
+        return message, None, exc
+
+
+async def _send_group(template_id: int, messages: list[OutboxMessage]) -> list[Outcome]:
+    if len(messages) == 1:
+        return [await _send_one(messages[0])]
+    try:
+        message_ids = await send_brevo_template_batch(
+            template_id,
+            [BrevoMessage(message.to_email, message.to_name, message.params) for message in messages],
+        )
+    except Exception as exc:
+        if not _is_rejected(exc):
+            return [(message, None, exc) for message in messages]
+        # Brevo rejects a batch as a whole (e.g. one bad address): send one
+        # by one so only the bad mails fail
+        return [await _send_one(message) for message in messages]
+    return [(message, {"messageId": message_id}, None) for message, message_id in zip(messages, message_ids)]
+
+
+async def deliver_outbox_messages(messages: list[OutboxMessage], concurrency: int) -> list[Outcome]:
+    """
+    Send claimed mails: one Brevo call per template (messageVersions), in
+    chunks of BREVO_BATCH_MAX_VERSIONS, at most `concurrency` calls at once.
+    """
+    groups: dict[int, list[OutboxMessage]] = {}
+    for message in messages:
+        groups.setdefault(message.template_id, []).append(message)
+
+    chunk_size = settings.BREVO_BATCH_MAX_VERSIONS
+    chunks = [
+        (template_id, group[start : start + chunk_size])
+        for template_id, group in groups.items()
+        for start in range(0, len(group), chunk_size)
+    ]
+    limit = asyncio.Semaphore(concurrency)
+
+    async def send(template_id: int, chunk: list[OutboxMessage]) -> list[Outcome]:
+        async with limit:
+            return await _send_group(template_id, chunk)
+
+    results = await asyncio.gather(*(send(template_id, chunk) for template_id, chunk in chunks))
+    return [outcome for outcomes in results for outcome in outcomes]
+
+
+class EmailOutboxDispatcher:
+    """
+    Background task that drains the email outbox: claims due mails in
+    batches, sends them (batched per template) and records sent / pending (retry with backoff) /
+    failed. Polls every `poll_seconds` and is woken right after an enqueue.
+    """
+
+    def __init__(
+        self,
+        deliver: Callable[[list[OutboxMessage], int], Awaitable[list[Outcome]]],
+        poll_seconds: float,
+        batch_size: int,
+        concurrency: int,
+        max_attempts: int,
+        claim_seconds: float,
+    ):
+        self._deliver = deliver
+        self.poll_seconds = poll_seconds
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.claim_seconds = claim_seconds
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._closing = False
+
+    def start(self):
+        if self._task is None:
+            self._closing = False
+            self._task = asyncio.create_task(self._run())
+
+    def wake(self):
+        """Call after committing new outbox rows, so they go out right away."""
+        self._wake.set()
+
+    async def _run(self):
+        while not self._closing:
+            self._wake.clear()
+            try:
+                claimed = await self.dispatch_once()
+            except Exception:
+                logger.exception("Email outbox dispatch failed")
+                claimed = 0
+            if claimed >= self.batch_size:
+                continue  # a full batch: more may be due
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def dispatch_once(self) -> int:
+        """Send one batch of due mails. Returns how many were claimed."""
+        messages = await asyncio.to_thread(claim_due_emails, self.batch_size, self.claim_seconds)
+        if not messages:
+            return 0
+
+        outcomes = await self._deliver(messages, self.concurrency)
+        counts = await asyncio.to_thread(record_deliveries, outcomes, self.max_attempts)
+        logger.info("Email outbox batch: %s", counts)
+        return len(messages)
+
+    async def close(self, timeout: float = 10.0):
+        """Let the current batch finish (up to `timeout`) and stop."""
+        if self._task is None:
+            return
+        self._closing = True
+        self._wake.set()
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            # cancelled mid-send: the claims expire and those mails are retried
+            logger.warning("Email outbox dispatcher did not stop in %.0fs", timeout)
+        self._task = None
+
+
+email_outbox_dispatcher = EmailOutboxDispatcher(
+    deliver_outbox_messages,
+    poll_seconds=settings.EMAIL_OUTBOX_POLL_SECONDS,
+    batch_size=settings.EMAIL_OUTBOX_BATCH_SIZE,
+    concurrency=settings.EMAIL_OUTBOX_CONCURRENCY,
+    max_attempts=settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+    claim_seconds=settings.EMAIL_OUTBOX_CLAIM_SECONDS,
+)
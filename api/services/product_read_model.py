@@ -0,0 +1,62 @@
+from sqlalchemy import select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from helpers.product_serializer import PRODUCT_LOAD_OPTIONS, render_product
+from models import Product, ProductCategory
+
+
+def render_products(db: Session, product_ids: list[int], chunk_size: int = 500):
+    """
+    Re-render the read model (Product.rendered_json) of `product_ids` from the
+    normalized tables. Runs in the caller's transaction, so it commits
+    together with the rows it was rendered from.
+    """
+    for start in range(0, len(product_ids), chunk_size):
+        ids = product_ids[start : start + chunk_size]
+        products = db.scalars(
+            select(Product)
+            .options(*PRODUCT_LOAD_OPTIONS)
+            .where(Product.id.in_(ids))
+            # children were rewritten with bulk statements, don't trust the identity map
+            .execution_options(populate_existing=True)
+        ).all()
+        if products:
+            db.execute(
+                update(Product),
+                [{"id": product.id, "rendered_json": render_product(product)} for product in products],
+            )
+
+
+def rendered_documents(db: Session, rows) -> list[str]:
+    """
+    Read model documents for (id, rendered_json) rows, in order. Products
+    without a document yet (written outside the sync) are rendered on the
+    fly; reads don't write, backfill_read_model stores them on the next start.
+    """
+    missing = [product_id for product_id, document in rows if document is None]
+    if not missing:
+        return [document for _, document in rows]
+    products = db.scalars(select(Product).options(*PRODUCT_LOAD_OPTIONS).where(Product.id.in_(missing)))
+    rendered = {product.id: render_product(product) for product in products}
+    return [rendered[product_id] if document is None else document for product_id, document in rows]
+
+
+def render_category_products(db: Session, category_ids: list[int]):
+    """Re-render every product linked to `category_ids` (after a rename etc.)."""
+    if not category_ids:
+        return
+    product_ids = db.scalars(
+        select(ProductCategory.c.product_id)
+        .where(ProductCategory.c.category_id.in_(category_ids))
+        .distinct()
+    ).all()
+    render_products(db, list(product_ids))
+
+
+def backfill_read_model(engine: Engine):
+    """Render products that have no read model yet (e.g. rows from before it existed)."""
+    with Session(engine) as db:
+        missing = db.scalars(select(Product.id).where(Product.rendered_json.is_(None))).all()
+        render_products(db, list(missing))
+        db.commit()
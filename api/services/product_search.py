@@ -0,0 +1,160 @@
+import re
+
+from sqlalchemy import Float, Integer, bindparam, false, literal, or_, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from models import Product
+
+
+# SQLite (DEV): FTS5 virtual table keyed by products.id (rowid)
+SQLITE_SETUP = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts
+    USING fts5(name, description, info, tokenize = 'unicode61 remove_diacritics 2')
+    """,
+]
+
+# Postgres (PROD): weighted tsvector per product behind a GIN index
+POSTGRES_SETUP = [
+    """
+    CREATE TABLE IF NOT EXISTS product_search (
+        product_id INTEGER PRIMARY KEY REFERENCES products(id) ON DELETE CASCADE,
+        document TSVECTOR NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_product_search_document ON product_search USING GIN (document)",
+]
+
+SQLITE_DELETE = text("DELETE FROM products_fts WHERE rowid IN :ids").bindparams(
+    bindparam("ids", expanding=True)
+)
+SQLITE_INSERT = text(
+    """
+    INSERT INTO products_fts (rowid, name, description, info)
+    SELECT p.id, coalesce(p.name, ''), coalesce(p.description, ''),
+           coalesce((SELECT group_concat(coalesce(i.title, '') || ' ' || coalesce(i.description, ''), ' ')
+                     FROM product_additional_infos i WHERE i.product_id = p.id), '')
+    FROM products p WHERE p.id IN :ids
+    """
+).bindparams(bindparam("ids", expanding=True))
+SQLITE_SEARCH = text(
+    """
+    SELECT rowid AS product_id, bm25(products_fts, 10.0, 2.0, 1.0) AS score
+    FROM products_fts WHERE products_fts MATCH :match
+    """
+)
+
+POSTGRES_INSERT = text(
+    """
+    INSERT INTO product_search (product_id, document)
+    SELECT p.id,
+           setweight(to_tsvector('simple', coalesce(p.name, '')), 'A')
+           || setweight(to_tsvector('simple', coalesce(p.description, '')), 'B')
+           || setweight(to_tsvector('simple', coalesce(
+                  (SELECT string_agg(coalesce(i.title, '') || ' ' || coalesce(i.description, ''), ' ')
+                   FROM product_additional_infos i WHERE i.product_id = p.id), '')), 'C')
+    FROM products p WHERE p.id IN :ids
+    ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document
+    """
+).bindparams(bindparam("ids", expanding=True))
+POSTGRES_SEARCH = text(
+    """
+    SELECT product_id, -ts_rank(document, to_tsquery('simple', :match)) AS score
+    FROM product_search WHERE document @@ to_tsquery('simple', :match)
+    """
+)
+
+
+def _dialect(bind) -> str:
+    return bind.dialect.name
+
+
+def create_search_table(connection):
+    """Create the (empty) index table; runs with every create_all of products."""
+    setup = {"sqlite": SQLITE_SETUP, "postgresql": POSTGRES_SETUP}.get(connection.dialect.name)
+    for statement in setup or []:
+        connection.execute(text(statement))
+
+
+def create_search_index(engine: Engine):
+    """Create the full-text index if needed and fill it when it is empty."""
+    dialect = _dialect(engine)
+    setup = {"sqlite": SQLITE_SETUP, "postgresql": POSTGRES_SETUP}.get(dialect)
+    if not setup:
+        return
+
+    with Session(engine) as db:
+        for statement in setup:
+            db.execute(text(statement))
+        table = "products_fts" if dialect == "sqlite" else "product_search"
+        indexed = db.execute(text(f"SELECT count(*) FROM {table}")).scalar()
+        if not indexed:
+            reindex_products(db, [row[0] for row in db.query(Product.id)])
+        db.commit()
+
+
+def reindex_products(db: Session, product_ids: list[int], chunk_size: int = 500):
+    """Refresh index rows for `product_ids`. Runs in the caller's transaction."""
+    dialect = _dialect(db.get_bind())
+    if dialect not in ("sqlite", "postgresql"):
+        return
+
+    for start in range(0, len(product_ids), chunk_size):
+        ids = product_ids[start : start + chunk_size]
+        if dialect == "sqlite":
+            # FTS5 has no upsert: drop and re-add the rows
+            db.execute(SQLITE_DELETE, {"ids": ids})
+            db.execute(SQLITE_INSERT, {"ids": ids})
+        else:
+            db.execute(POSTGRES_INSERT, {"ids": ids})
+
+
+def remove_from_index(db: Session, product_ids: list[int]):
+    dialect = _dialect(db.get_bind())
+    # Postgres rows go away with the product (ON DELETE CASCADE)
+    if dialect == "sqlite" and product_ids:
+        db.execute(SQLITE_DELETE, {"ids": product_ids})
+
+
+def _terms(q: str) -> list[str]:
+    return re.findall(r"\w+", q.lower())
+
+
+def search_subquery(db: Session, q: str):
+    """
+    Ranked matches for `q` as a subquery with (product_id, score) columns,
+    lower score = better match. Every term must match (prefix match).
+    Returns None when the backend has no full-text index.
+    """
+    terms = _terms(q)
+    dialect = _dialect(db.get_bind())
+    if dialect not in ("sqlite", "postgresql"):
+        return None
+
+    if not terms:
+        # nothing searchable (e.g. only punctuation) -> no matches
+        return (
+            select(Product.id.label("product_id"), literal(0.0).label("score"))
+            .where(false())
+            .subquery("search")
+        )
+
+    if dialect == "sqlite":
+        statement = SQLITE_SEARCH
+        match = " ".join(f'"{term}"*' for term in terms)
+    else:
+        statement = POSTGRES_SEARCH
+        match = " & ".join(f"{term}:*" for term in terms)
+
+    return (
+        statement.bindparams(match=match)
+        .columns(product_id=Integer, score=Float)
+        .subquery("search")
+    )
+
+
+def ilike_search_filter(q: str):
+    # fallback for backends without a full-text index
+    pattern = f"%{q}%"
+    return or_(Product.name.ilike(pattern), Product.description.ilike(pattern))
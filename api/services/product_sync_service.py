@@ -0,0 +1,547 @@
+import json
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import AsyncIterable, Iterable
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from helpers.wix_mapper import map_wix_products, product_content_hash
+from models import (
+    Category,
+    Product,
+    ProductAdditionalInfo,
+    ProductCategory,
+    ProductImage,
+    SyncState,
+)
+from services.catalog_cache import mark_catalog_changed
+from services.catalog_index import refresh_catalog_index
+from services.product_read_model import render_category_products, render_products
+from services.product_search import reindex_products, remove_from_index
+from services.sync_jobs import SyncJob, run_in_sync_worker
+from services.wix_api_service import WIX_QUERY_PAGE_SIZE, wix_keyset_pages, wix_query_pages
+from settings import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+SYNC_BATCH_SIZE = 500
+
+WIX_PRODUCTS_ENDPOINT = "stores-reader/v1/products/query"
+WIX_PRODUCTS_SOURCE = "wix_products"
+WIX_COLLECTIONS_ENDPOINT = "stores/v1/collections/query"
+
+PRODUCT_FIELDS = (
+    "name",
+    "description",
+    "price",
+    "discounted_price",
+    "discounted_type",
+    "discounted_amount",
+    "created_date",
+    "last_updated",
+    "visible_in_wix",
+    "weight",
+)
+
+
+def prefetch_products(
+    db: Session, wix_ids: list[str] | None = None
+) -> dict[str, tuple[int, str | None]]:
+    # one query for the whole catalog (or just `wix_ids`): wix_id -> (products.id, content_hash)
+    statement = select(Product.wix_id, Product.id, Product.content_hash)
+    if wix_ids is not None:
+        statement = statement.where(Product.wix_id.in_(wix_ids))
+    rows = db.execute(statement)
+    return {wix_id: (product_id, content_hash) for wix_id, product_id, content_hash in rows}
+
+
+def prefetch_category_ids(db: Session) -> dict[str, int]:
+    # one query for all categories: wix_id -> categories.id
+    return dict(db.execute(select(Category.wix_id, Category.id)).all())
+
+
+@dataclass
+class ProductSyncResult:
+    product_ids: list[int] = field(default_factory=list)
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    # rows removed by a webhook delete or the full-sync sweep
+    deleted: dict[str, int] = field(default_factory=dict)
+    sweep_refused: bool = False
+
+    def counts(self) -> dict[str, int]:
+        counts = {
+            "created": self.created,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+            "deleted": 0,
+            **self.deleted,
+        }
+        if self.sweep_refused:
+            counts["sweep_refused"] = 1
+        return counts
+
+
+def upsert_product_batch(
+    db: Session,
+    mapped_products: list[dict],
+    products: dict[str, tuple[int, str | None]],
+    category_ids: dict[str, int],
+    result: ProductSyncResult,
+):
+    """
+    Write one batch of mapped Wix products with set-based statements and a
+    single commit. Products whose content hash did not change are skipped
+    entirely. `products` and `result` are updated in place.
+    """
+    # last occurrence wins if Wix ever returns the same product twice
+    batch = {mapped["wix_id"]: mapped for mapped in mapped_products}
+    if not batch:
+        return
+
+    new_rows = []
+    update_rows = []
+    changed = {}
+    for wix_id, mapped in batch.items():
+        linked = []
+        for wix_cat_id in mapped.get("category_ids") or []:
+            category_id = category_ids.get(wix_cat_id)
+            if category_id and category_id not in linked:
+                linked.append(category_id)
+        content_hash = product_content_hash(mapped, linked)
+
+        existing = products.get(wix_id)
+        if existing and existing[1] == content_hash:
+            result.unchanged += 1
+            continue
+
+        changed[wix_id] = (mapped, linked)
+        row = {name: mapped[name] for name in PRODUCT_FIELDS}
+        row["content_hash"] = content_hash
+        if existing:
+            row["id"] = existing[0]
+            update_rows.append(row)
+            products[wix_id] = (existing[0], content_hash)
+        else:
+            row["wix_id"] = wix_id
+            new_rows.append(row)
+
+    # 1. Create/update products
+    if new_rows:
+        created = db.execute(
+            insert(Product).returning(Product.id, Product.wix_id, Product.content_hash),
+            new_rows,
+        )
+        for product_id, wix_id, content_hash in created:
+            products[wix_id] = (product_id, content_hash)
+        result.created += len(new_rows)
+
+    if update_rows:
+        # ORM bulk UPDATE by primary key (executemany)
+        db.execute(update(Product), update_rows)
+        result.updated += len(update_rows)
+
+    result.product_ids.extend(products[wix_id][0] for wix_id in batch)
+    if not changed:
+        return
+
+    ids = [products[wix_id][0] for wix_id in changed]
+
+    # 2. Drop old children of the changed products at once
+    db.execute(delete(ProductImage).where(ProductImage.product_id.in_(ids)))
+    db.execute(
+        delete(ProductAdditionalInfo).where(ProductAdditionalInfo.product_id.in_(ids))
+    )
+    db.execute(delete(ProductCategory).where(ProductCategory.c.product_id.in_(ids)))
+
+    # 3. Re-insert images, categories and additional info
+    image_rows = []
+    info_rows = []
+    link_rows = []
+    for wix_id, (mapped, linked) in changed.items():
+        product_id = products[wix_id][0]
+        for image in mapped["images"]:
+            image_rows.append(
+                {
+                    "media_url": image["media_url"],
+                    "thumbnail_url": image["thumbnail_url"],
+                    "is_main_media": image["is_main_media"],
+                    "product_id": product_id,
+                }
+            )
+        for info in mapped.get("additional_info") or []:
+            info_rows.append(
+                {
+                    "title": info["title"],
+                    "description": info["description"],
+                    "product_id": product_id,
+                }
+            )
+        for category_id in linked:
+            link_rows.append({"product_id": product_id, "category_id": category_id})
+
+    if image_rows:
+        db.execute(insert(ProductImage), image_rows)
+    if info_rows:
+        db.execute(insert(ProductAdditionalInfo), info_rows)
+    if link_rows:
+        db.execute(insert(ProductCategory), link_rows)
+
+    # 4. Keep the full-text index and the read model in the same transaction
+    reindex_products(db, ids)
+    render_products(db, ids)
+
+    db.commit()
+
+
+def delete_products(
+    db: Session, product_ids: list[int], chunk_size: int = SYNC_BATCH_SIZE
+) -> dict[str, int]:
+    """
+    Delete products with their images, info sections, category links and
+    search rows, set-based and chunked. Runs in the caller's transaction.
+    Returns the deleted row counts.
+    """
+    counts = {"deleted": 0, "deleted_images": 0, "deleted_info_sections": 0, "deleted_category_links": 0}
+    for start in range(0, len(product_ids), chunk_size):
+        ids = product_ids[start : start + chunk_size]
+        counts["deleted_images"] += db.execute(
+            delete(ProductImage).where(ProductImage.product_id.in_(ids))
+        ).rowcount
+        counts["deleted_info_sections"] += db.execute(
+            delete(ProductAdditionalInfo).where(ProductAdditionalInfo.product_id.in_(ids))
+        ).rowcount
+        counts["deleted_category_links"] += db.execute(
+            delete(ProductCategory).where(ProductCategory.c.product_id.in_(ids))
+        ).rowcount
+        remove_from_index(db, ids)
+        counts["deleted"] += db.execute(delete(Product).where(Product.id.in_(ids))).rowcount
+    return counts
+
+
+def delete_categories(db: Session, category_ids: list[int]) -> dict[str, int]:
+    """
+    Delete categories and their product links, and re-render the products
+    that lost a category. Runs in the caller's transaction.
+    """
+    if not category_ids:
+        return {"deleted": 0, "deleted_category_links": 0}
+    product_ids = db.scalars(
+        select(ProductCategory.c.product_id)
+        .where(ProductCategory.c.category_id.in_(category_ids))
+        .distinct()
+    ).all()
+    links = db.execute(
+        delete(ProductCategory).where(ProductCategory.c.category_id.in_(category_ids))
+    ).rowcount
+    deleted = db.execute(delete(Category).where(Category.id.in_(category_ids))).rowcount
+    render_products(db, list(product_ids))
+    return {"deleted": deleted, "deleted_category_links": links}
+
+
+def sweep_allowed(seen: int, existing: int) -> bool:
+    # a suspiciously small Wix listing (outage, auth/filter bug) must not wipe the catalog
+    return not existing or seen >= existing * settings.SYNC_SWEEP_MIN_RATIO
+
+
+def sync_wix_product_items(
+    db: Session, items: Iterable[dict], batch_size: int = SYNC_BATCH_SIZE
+) -> ProductSyncResult:
+    """Map and upsert raw Wix products batch by batch."""
+    products = prefetch_products(db)
+    category_ids = prefetch_category_ids(db)
+
+    result = ProductSyncResult()
+    batch: list[dict] = []
+    for mapped in map_wix_products(items):
+        batch.append(mapped)
+        if len(batch) >= batch_size:
+            upsert_product_batch(db, batch, products, category_ids, result)
+            batch = []
+    if batch:
+        upsert_product_batch(db, batch, products, category_ids, result)
+
+    return result
+
+
+def _map_page(page: list[dict]) -> list[dict]:
+    return list(map_wix_products(page))
+
+
+async def sync_wix_product_pages(
+    db: Session,
+    pages: AsyncIterable[list[dict]],
+    batch_size: int = SYNC_BATCH_SIZE,
+    job: SyncJob | None = None,
+) -> ProductSyncResult:
+    """
+    Async counterpart of sync_wix_product_items for paged Wix responses.
+    Mapping and DB writes run on the sync worker thread, so the next pages
+    keep downloading while the current batch is written. Each page is
+    mapped as it arrives and the raw page dropped, so only mapped records
+    wait for the batch to fill.
+    """
+    products = await run_in_sync_worker(prefetch_products, db)
+    category_ids = await run_in_sync_worker(prefetch_category_ids, db)
+
+    result = ProductSyncResult()
+    pending: list[dict] = []
+
+    async def flush():
+        await run_in_sync_worker(upsert_product_batch, db, pending, products, category_ids, result)
+        if job:
+            job.rows_written = result.created + result.updated
+            job.counts = result.counts()
+
+    async for page in pages:
+        if job:
+            job.pages_fetched += 1
+        pending.extend(await run_in_sync_worker(_map_page, page))
+        del page
+        if len(pending) >= batch_size:
+            await flush()
+            pending = []
+    if pending:
+        await flush()
+
+    return result
+
+
+def get_sync_watermark(db: Session, source: str) -> datetime | None:
+    state = db.get(SyncState, source)
+    return state.watermark if state else None
+
+
+def save_sync_watermark(db: Session, source: str, watermark: datetime | None):
+    if watermark is None:
+        return
+    state = db.get(SyncState, source)
+    if not state:
+        state = SyncState(source=source)
+        db.add(state)
+    # never move the watermark backwards
+    if state.watermark is None or watermark > state.watermark:
+        state.watermark = watermark
+    db.commit()
+
+
+def wix_products_changed_since(since: datetime) -> dict:
+    # $gte so an edit in the same millisecond as the watermark is never
+    # missed (re-upsert is idempotent). Stored watermarks are naive UTC.
+    if since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    since_iso = since.isoformat(timespec="milliseconds") + "Z"
+    return {"lastUpdated": {"$gte": since_iso}}
+
+
+def _max_last_updated(db: Session) -> datetime | None:
+    return db.execute(select(func.max(Product.last_updated))).scalar()
+
+
+def sweep_unseen_products(db: Session, result: ProductSyncResult):
+    """Mark-and-sweep after a full sync: delete products Wix did not return."""
+    seen = set(result.product_ids)
+    existing = db.scalars(select(Product.id)).all()
+    if not sweep_allowed(len(seen), len(existing)):
+        logger.warning(
+            "Product sweep refused: Wix returned %d products, %d stored", len(seen), len(existing)
+        )
+        result.sweep_refused = True
+        return
+
+    result.deleted = delete_products(db, [product_id for product_id in existing if product_id not in seen])
+    db.commit()
+
+
+async def run_wix_product_sync(
+    db: Session, full: bool = False, job: SyncJob | None = None
+) -> ProductSyncResult:
+    """
+    Sync products from Wix. Incremental by default: only products updated
+    since the stored watermark are requested and upserted. `full=True`
+    re-downloads the whole catalog.
+    """
+    since = None
+    if not full:
+        since = await run_in_sync_worker(get_sync_watermark, db, WIX_PRODUCTS_SOURCE)
+
+    if since is None:
+        # keyset by id, not offsets: the sweep deletes whatever this walk
+        # doesn't see, so a delete/reorder in Wix mid-walk must not make it
+        # skip a live product
+        pages = wix_keyset_pages(WIX_PRODUCTS_ENDPOINT, "products", keys=("id",))
+    else:
+        # keyset by (lastUpdated, id): a product edited mid-walk moves behind
+        # the cursor and is fetched again instead of shifting the next page
+        pages = wix_keyset_pages(
+            WIX_PRODUCTS_ENDPOINT,
+            "products",
+            keys=("lastUpdated", "id"),
+            query_filter=wix_products_changed_since(since),
+        )
+    result = await sync_wix_product_pages(db, pages, job=job)
+
+    if full:
+        # every product Wix still has was seen; the rest was deleted there
+        await run_in_sync_worker(sweep_unseen_products, db, result)
+
+    watermark = await run_in_sync_worker(_max_last_updated, db)
+    await run_in_sync_worker(save_sync_watermark, db, WIX_PRODUCTS_SOURCE, watermark)
+
+    if result.created or result.updated or result.deleted.get("deleted"):
+        await run_in_sync_worker(mark_catalog_changed, db)
+        await run_in_sync_worker(refresh_catalog_index, db)
+    return result
+
+
+def upsert_category_page(db: Session, items: list[dict], existing: dict[str, Category]) -> int:
+    # current name/description, to know whose products' read model is stale
+    current = {
+        wix_id: (category_id, name, description)
+        for wix_id, category_id, name, description in db.execute(
+            select(Category.wix_id, Category.id, Category.name, Category.description)
+            .where(Category.wix_id.in_([item["id"] for item in items]))
+        )
+    }
+
+    renamed = []
+    for item in items:
+        category = existing.get(item["id"])
+        if not category:
+            category = Category(wix_id=item["id"])
+            existing[item["id"]] = category
+
+        if item["id"] in current:
+            category_id, name, description = current[item["id"]]
+            if (name, description) != (item.get("name"), item.get("description")):
+                renamed.append(category_id)
+
+        category.name = item.get("name")
+        category.description = item.get("description")
+        category.visible_in_wix = item.get("visible", True)
+        db.add(category)
+
+    db.flush()
+    render_category_products(db, renamed)
+    db.commit()
+    return len(items)
+
+
+def _load_categories(db: Session) -> dict[str, Category]:
+    return {category.wix_id: category for category in db.query(Category)}
+
+
+def sweep_unseen_categories(db: Session, seen: set[str]) -> dict[str, int]:
+    """Delete categories whose collection was not in the full Wix listing."""
+    existing = dict(db.execute(select(Category.wix_id, Category.id)).all())
+    if not sweep_allowed(len(seen), len(existing)):
+        logger.warning(
+            "Category sweep refused: Wix returned %d collections, %d stored", len(seen), len(existing)
+        )
+        return {"sweep_refused": 1}
+
+    counts = delete_categories(db, [category_id for wix_id, category_id in existing.items() if wix_id not in seen])
+    db.commit()
+    return counts
+
+
+async def run_wix_category_sync(db: Session, job: SyncJob | None = None) -> int:
+    """
+    Upsert all Wix collections as categories and sweep the ones Wix no
+    longer has. Returns the number synced.
+    """
+    # one lookup for all categories instead of one per collection
+    existing = await run_in_sync_worker(_load_categories, db)
+
+    synced = 0
+    seen: set[str] = set()
+    # keyset by id for the same reason as the product sweep
+    async for page in wix_keyset_pages(WIX_COLLECTIONS_ENDPOINT, "collections", keys=("id",)):
+        seen.update(item["id"] for item in page)
+        synced += await run_in_sync_worker(upsert_category_page, db, page, existing)
+        if job:
+            job.pages_fetched += 1
+            job.rows_written = synced
+
+    swept = await run_in_sync_worker(sweep_unseen_categories, db, seen)
+    if job:
+        job.counts = {"synced": synced, **swept}
+
+    await run_in_sync_worker(mark_catalog_changed, db)
+    await run_in_sync_worker(refresh_catalog_index, db)
+    return synced
+
+
+def _wix_id_filter(wix_ids: list[str]) -> dict:
+    return {"filter": json.dumps({"id": {"$hasSome": wix_ids}})}
+
+
+def _delete_products_by_wix_id(db: Session, wix_ids: list[str]) -> dict[str, int]:
+    ids = db.scalars(select(Product.id).where(Product.wix_id.in_(wix_ids))).all()
+    deleted = delete_products(db, list(ids))
+    db.commit()
+    return deleted
+
+
+def _upsert_products_by_wix_id(db: Session, items: list[dict], result: ProductSyncResult):
+    # only the touched products are prefetched, not the whole catalog
+    products = prefetch_products(db, [item["id"] for item in items])
+    upsert_product_batch(db, _map_page(items), products, prefetch_category_ids(db), result)
+
+
+async def sync_wix_products_by_id(
+    db: Session, upsert_ids: list[str], delete_ids: list[str]
+) -> dict[str, int]:
+    """
+    Apply webhook changes for single products: re-fetch `upsert_ids` from
+    Wix and upsert them with the batch upsert, delete `delete_ids`.
+    """
+    result = ProductSyncResult()
+    for start in range(0, len(upsert_ids), WIX_QUERY_PAGE_SIZE):
+        query = _wix_id_filter(upsert_ids[start : start + WIX_QUERY_PAGE_SIZE])
+        # fresh: a cached copy could predate the change the webhook announced
+        pages = wix_query_pages(WIX_PRODUCTS_ENDPOINT, "products", query=query, fresh=True)
+        async for page in pages:
+            await run_in_sync_worker(_upsert_products_by_wix_id, db, page, result)
+
+    if delete_ids:
+        result.deleted = await run_in_sync_worker(_delete_products_by_wix_id, db, delete_ids)
+    return result.counts()
+
+
+def _delete_categories_by_wix_id(db: Session, wix_ids: list[str]) -> dict[str, int]:
+    ids = db.scalars(select(Category.id).where(Category.wix_id.in_(wix_ids))).all()
+    deleted = delete_categories(db, list(ids))
+    db.commit()
+    return deleted
+
+
+def _upsert_categories_by_wix_id(db: Session, items: list[dict]) -> int:
+    wix_ids = [item["id"] for item in items]
+    existing = {
+        category.wix_id: category
+        for category in db.query(Category).filter(Category.wix_id.in_(wix_ids))
+    }
+    return upsert_category_page(db, items, existing)
+
+
+async def sync_wix_categories_by_id(
+    db: Session, upsert_ids: list[str], delete_ids: list[str]
+) -> dict[str, int]:
+    """Webhook counterpart of run_wix_category_sync for single collections."""
+    synced = 0
+    for start in range(0, len(upsert_ids), WIX_QUERY_PAGE_SIZE):
+        query = _wix_id_filter(upsert_ids[start : start + WIX_QUERY_PAGE_SIZE])
+        pages = wix_query_pages(WIX_COLLECTIONS_ENDPOINT, "collections", query=query, fresh=True)
+        async for page in pages:
+            synced += await run_in_sync_worker(_upsert_categories_by_wix_id, db, page)
+
+    deleted = {}
+    if delete_ids:
+        deleted = await run_in_sync_worker(_delete_categories_by_wix_id, db, delete_ids)
+    return {"synced": synced, **deleted}
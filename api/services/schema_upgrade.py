@@ -0,0 +1,42 @@
+import logging
+
+from sqlalchemy import MetaData, inspect, text
+from sqlalchemy.engine import Engine
+
+from database import Base
+
+logger = logging.getLogger(__name__)
+
+
+def upgrade_schema(engine: Engine, metadata: MetaData = Base.metadata):
+    """
+    Bring tables that already exist up to the models. create_all only
+    creates missing tables, so columns and indexes added to a model later
+    (content_hash, rendered_json, the keyset/foreign key indexes, ...) are
+    added here. Idempotent; runs on every start after create_all.
+
+    Only nullable columns can be added this way; anything else needs a
+    hand-written migration and is just logged.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        preparer = connection.dialect.identifier_preparer
+        for table in metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                if column.primary_key or not column.nullable:
+                    logger.warning("Column %s.%s is missing and can't be added automatically", table.name, column.name)
+                    continue
+                column_type = column.type.compile(dialect=connection.dialect)
+                connection.execute(
+                    text(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} {column_type}")
+                )
+                logger.info("Added column %s.%s", table.name, column.name)
+
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
@@ -0,0 +1,117 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from functools import partial
+from typing import Awaitable, Callable
+from uuid import uuid4
+
+from fastapi import HTTPException
+
+
+# Finished jobs kept for status polling (per worker process)
+MAX_FINISHED_JOBS = 50
+
+# All sync DB work runs on this dedicated thread, never on the event loop.
+# One thread also means a job's Session is only ever touched by one thread.
+sync_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="wix-sync")
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+@dataclass
+class SyncJob:
+    resource: str
+    full: bool = False
+    id: str = field(default_factory=lambda: uuid4().hex)
+    status: str = "queued"
+    started_at: datetime = field(default_factory=utcnow)
+    finished_at: datetime | None = None
+    pages_fetched: int = 0
+    rows_written: int = 0
+    counts: dict[str, int] = field(default_factory=dict)
+    errors: list[str] = field(default_factory=list)
+    task: asyncio.Task | None = field(default=None, repr=False)
+
+    @property
+    def elapsed_seconds(self) -> float:
+        end = self.finished_at or utcnow()
+        return round((end - self.started_at).total_seconds(), 3)
+
+
+_jobs: dict[str, SyncJob] = {}
+_running: dict[str, SyncJob] = {}
+
+
+async def run_in_sync_worker(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(sync_executor, partial(fn, *args, **kwargs))
+
+
+def submit_sync_job(
+    resource: str,
+    runner: Callable[[SyncJob], Awaitable[None]],
+    full: bool = False,
+) -> SyncJob:
+    """
+    Start `runner(job)` in the background and return the job right away.
+    If a job for the same resource is still running, that job is returned
+    instead of starting a duplicate; if it runs in the other mode (full vs
+    incremental) the request is refused with a 409.
+    """
+    running = _running.get(resource)
+    if running:
+        if running.full != full:
+            mode = "A full" if running.full else "An incremental"
+            raise HTTPException(
+                status_code=409,
+                detail=f"{mode} {resource} sync is already running (job {running.id}), retry when it's done",
+            )
+        return running
+
+    job = SyncJob(resource=resource, full=full)
+    _jobs[job.id] = job
+    _running[resource] = job
+    job.task = asyncio.create_task(_run_job(job, runner))
+    return job
+
+
+def get_sync_job(job_id: str) -> SyncJob | None:
+    return _jobs.get(job_id)
+
+
+def is_sync_running(resource: str) -> bool:
+    return resource in _running
+
+
+async def _run_job(job: SyncJob, runner: Callable[[SyncJob], Awaitable[None]]):
+    job.status = "running"
+    try:
+        await runner(job)
+        job.status = "succeeded"
+    except asyncio.CancelledError:
+        job.status = "cancelled"
+        raise
+    except Exception as e:
+        job.errors.append(str(e))
+        job.status = "failed"
+    finally:
+        job.finished_at = utcnow()
+        job.task = None
+        _running.pop(job.resource, None)
+        _prune_finished_jobs()
+
+
+def _prune_finished_jobs():
+    finished = [job for job in _jobs.values() if job.finished_at]
+    for job in finished[:-MAX_FINISHED_JOBS]:
+        _jobs.pop(job.id, None)
+
+
+def shutdown_sync_jobs():
+    for job in _running.values():
+        if job.task:
+            job.task.cancel()
+    sync_executor.shutdown(wait=False, cancel_futures=True)
@@ -1,15 +1,26 @@
+import asyncio
 import httpx
+import orjson
+from typing import AsyncIterator
 from fastapi import HTTPException
+from services.wix_read_cache import WixReadCache, is_read_only, make_key
+from services.wix_scheduler import WixRequestScheduler
 from settings import get_settings
 
 settings = get_settings()
 
 
-WIX_API_BASE = "https://www.wixapis.com/"
+WIX_API_BASE = settings.WIX_API_BASE.rstrip("/") + "/"
 WIX_API_KEY = settings.WIX_API_KEY
 WIX_SITE_ID = settings.WIX_SITE_ID
 
 
+# Wix Stores v1 query endpoints accept at most 100 items per page
+WIX_QUERY_PAGE_SIZE = 100
+# pages fetched ahead of the consumer while it maps/writes the current one
+WIX_PREFETCH_PAGES = 2
+
+
 HEADERS = {
     "Authorization": WIX_API_KEY,
     "wix-site-id": WIX_SITE_ID,
@@ -17,12 +28,95 @@ HEADERS = {
 }
 
 
-async def wix_get_request(endpoint: str, params: dict = None) -> dict:
-    return await _wix_request("GET", endpoint, params=params)
+# One pooled client per worker: connections (TCP + TLS) are kept alive and
+# reused across calls instead of a new handshake per request
+_client: httpx.AsyncClient | None = None
+# rate limit / retry state shared by every call through that client
+_scheduler: WixRequestScheduler | None = None
+_read_cache: WixReadCache | None = None
+
+
+def create_wix_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        headers=HEADERS,
+        http2=settings.WIX_HTTP2,
+        limits=httpx.Limits(
+            max_connections=settings.WIX_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.WIX_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=settings.WIX_HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(
+            connect=settings.WIX_CONNECT_TIMEOUT,
+            read=settings.WIX_READ_TIMEOUT,
+            write=settings.WIX_WRITE_TIMEOUT,
+            pool=settings.WIX_POOL_TIMEOUT,
+        ),
+    )
+
+
+def create_wix_scheduler() -> WixRequestScheduler:
+    return WixRequestScheduler(
+        rate=settings.WIX_RATE_LIMIT_PER_SECOND,
+        burst=settings.WIX_RATE_LIMIT_BURST,
+        max_in_flight=settings.WIX_MAX_IN_FLIGHT,
+        max_retries=settings.WIX_MAX_RETRIES,
+        backoff_base=settings.WIX_BACKOFF_BASE_SECONDS,
+        backoff_max=settings.WIX_BACKOFF_MAX_SECONDS,
+    )
+
+
+def _open_wix_client():
+    global _client, _scheduler, _read_cache
+    _client = create_wix_client()
+    _scheduler = create_wix_scheduler()
+    _read_cache = WixReadCache(
+        ttl=settings.WIX_READ_CACHE_TTL_SECONDS,
+        max_entries=settings.WIX_READ_CACHE_MAX_ENTRIES,
+        max_bytes=settings.WIX_READ_CACHE_MAX_BYTES,
+    )
+
+
+async def start_wix_client():
+    if _client is None:
+        _open_wix_client()
+
 
+async def close_wix_client():
+    global _client, _scheduler, _read_cache
+    if _client is not None:
+        await _client.aclose()
+        _client = _scheduler = _read_cache = None
 
-async def wix_post_request(endpoint: str, json_data: dict = None) -> dict:
-    return await _wix_request("POST", endpoint, json=json_data)
+
+def get_wix_client() -> httpx.AsyncClient:
+    # lazy fallback for code running outside the app lifespan (scripts)
+    if _client is None:
+        _open_wix_client()
+    return _client
+
+
+def get_wix_scheduler() -> WixRequestScheduler:
+    get_wix_client()
+    return _scheduler
+
+
+def get_wix_read_cache() -> WixReadCache:
+    get_wix_client()
+    return _read_cache
+
+
+def wix_client_stats() -> dict:
+    return {**get_wix_scheduler().stats(), "read_cache": get_wix_read_cache().stats()}
+
+
+async def wix_get_request(endpoint: str, params: dict = None, fresh: bool = False) -> dict:
+    return await _wix_request("GET", endpoint, params=params, fresh=fresh)
+
+
+async def wix_post_request(
+    endpoint: str, json_data: dict = None, fresh: bool = False, cache: bool = True
+) -> dict:
+    return await _wix_request("POST", endpoint, json=json_data, fresh=fresh, cache=cache)
 
 
 async def wix_put_request(endpoint: str, json_data: dict) -> dict:
@@ -38,19 +132,40 @@ async def wix_delete_request(endpoint: str) -> dict:
 
 
 async def _wix_request(
-    method: str, endpoint: str, params: dict = None, json: dict = None
+    method: str,
+    endpoint: str,
+    params: dict = None,
+    json: dict = None,
+    fresh: bool = False,
+    cache: bool = True,
 ) -> dict:
+    """
+    `fresh=True` skips the read cache (and single-flight) for callers that
+    must see the current state, e.g. right after a webhook. `cache=False`
+    keeps single-flight but doesn't store the body (sync traversals).
+    """
+    if fresh or not is_read_only(method, endpoint):
+        body = await _wix_send(method, endpoint, params, json)
+    else:
+        key = make_key(method, endpoint, params, json)
+        body = await get_wix_read_cache().fetch(
+            key, lambda: _wix_send(method, endpoint, params, json), store=cache
+        )
+    # parsed per caller, so cached/shared bodies are never mutated
+    return orjson.loads(body)
+
+
+async def _wix_send(method: str, endpoint: str, params: dict | None, json: dict | None) -> bytes:
     url = WIX_API_BASE + endpoint.lstrip("/")
 
+    client = get_wix_client()
     try:
-        async with httpx.AsyncClient(timeout=10) as client:
-            response = await client.request(
-                method,
-                url,
-                headers=HEADERS,
-                params=params,
-                json=json,
-            )
+        # throttled, capped and retried (429/5xx/network) by the scheduler
+        response = await get_wix_scheduler().send(
+            method,
+            endpoint,
+            lambda: client.request(method, url, params=params, json=json),
+        )
 
         if response.status_code >= 400:
             raise HTTPException(
@@ -58,7 +173,128 @@ async def _wix_request(
                 detail=f"Wix API {method} error: {response.text}",
             )
 
-        return response.json()
+        return response.content
 
     except httpx.RequestError as exc:
         raise HTTPException(status_code=500, detail=f"Wix {method} failed: {exc}")
+
+
+async def _wix_query_page_iter(
+    endpoint: str, items_key: str, query: dict | None, page_size: int, fresh: bool
+) -> AsyncIterator[list[dict]]:
+    offset = 0
+    while True:
+        body = {"query": {**(query or {}), "paging": {"limit": page_size, "offset": offset}}}
+        # pages of a walk are read once: coalesced, not kept in the cache
+        data = await wix_post_request(endpoint, body, fresh=fresh, cache=False)
+        items = data.get(items_key, [])
+        if items:
+            yield items
+
+        offset += len(items)
+        total = data.get("totalResults")
+        if len(items) < page_size or (total is not None and offset >= total):
+            return
+
+
+def keyset_filter(keys: tuple[str, ...], values: tuple) -> dict:
+    """Wix filter for the rows after `values` in (keys...) ascending order."""
+    key, value = keys[0], values[0]
+    after = {key: {"$gt": value}}
+    if len(keys) == 1:
+        return after
+    return {"$or": [after, {"$and": [{key: {"$eq": value}}, keyset_filter(keys[1:], values[1:])]}]}
+
+
+async def _wix_keyset_page_iter(
+    endpoint: str,
+    items_key: str,
+    keys: tuple[str, ...],
+    query_filter: dict | None,
+    page_size: int,
+    fresh: bool,
+) -> AsyncIterator[list[dict]]:
+    sort = orjson.dumps([{key: "asc"} for key in keys]).decode()
+    cursor = None
+    while True:
+        conditions = [query_filter] if query_filter else []
+        if cursor is not None:
+            conditions.append(keyset_filter(keys, cursor))
+        query = {"sort": sort, "paging": {"limit": page_size}}
+        if conditions:
+            where = conditions[0] if len(conditions) == 1 else {"$and": conditions}
+            query["filter"] = orjson.dumps(where).decode()
+
+        data = await wix_post_request(endpoint, {"query": query}, fresh=fresh, cache=False)
+        items = data.get(items_key, [])
+        if items:
+            yield items
+        if len(items) < page_size:
+            return
+        cursor = tuple(items[-1][key] for key in keys)
+
+
+async def _prefetched(pages: AsyncIterator[list[dict]], prefetch: int) -> AsyncIterator[list[dict]]:
+    """
+    Up to `prefetch` pages are fetched in the background while the caller
+    processes the current page, so network and DB work overlap while memory
+    stays bounded by the window.
+    """
+    done = object()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(prefetch, 1))
+
+    async def producer():
+        try:
+            async for page in pages:
+                await queue.put(page)
+            await queue.put(done)
+        except Exception as exc:
+            await queue.put(exc)
+
+    task = asyncio.create_task(producer())
+    try:
+        while True:
+            page = await queue.get()
+            if page is done:
+                return
+            if isinstance(page, Exception):
+                raise page
+            yield page
+    finally:
+        task.cancel()
+
+
+def wix_query_pages(
+    endpoint: str,
+    items_key: str,
+    query: dict | None = None,
+    page_size: int = WIX_QUERY_PAGE_SIZE,
+    prefetch: int = WIX_PREFETCH_PAGES,
+    fresh: bool = False,
+) -> AsyncIterator[list[dict]]:
+    """
+    Walk a Wix query endpoint page by page (offset paging), prefetching up
+    to `prefetch` pages. Only for small or static listings: rows that move
+    while paging shift the offsets. `fresh` bypasses the read cache.
+    """
+    return _prefetched(_wix_query_page_iter(endpoint, items_key, query, page_size, fresh), prefetch)
+
+
+def wix_keyset_pages(
+    endpoint: str,
+    items_key: str,
+    keys: tuple[str, ...],
+    query_filter: dict | None = None,
+    page_size: int = WIX_QUERY_PAGE_SIZE,
+    prefetch: int = WIX_PREFETCH_PAGES,
+    fresh: bool = False,
+) -> AsyncIterator[list[dict]]:
+    """
+    Walk a Wix query endpoint sorted by `keys` (the last one unique, e.g.
+    id), each page asking for the rows after the previous page's last one.
+    Rows that are edited, added or deleted meanwhile can't make the walk
+    skip others, unlike offset paging.
+    """
+    return _prefetched(
+        _wix_keyset_page_iter(endpoint, items_key, keys, query_filter, page_size, fresh), prefetch
+    )
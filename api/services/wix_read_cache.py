@@ -0,0 +1,115 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+
+def is_read_only(method: str, endpoint: str) -> bool:
+    # GETs and the (POST) query endpoints never change anything on Wix
+    return method == "GET" or endpoint.rstrip("/").endswith("/query")
+
+
+def make_key(method: str, endpoint: str, params: dict | None, body: dict | None) -> tuple:
+    # normalized: key order and whitespace don't matter
+    return (
+        method,
+        endpoint.strip("/"),
+        json.dumps(params or {}, sort_keys=True, separators=(",", ":")),
+        json.dumps(body or {}, sort_keys=True, separators=(",", ":")),
+    )
+
+
+def _retrieve_exception(task: asyncio.Task):
+    # a failed load nobody waits for anymore is not an "unretrieved" error
+    if not task.cancelled():
+        task.exception()
+
+
+class WixReadCache:
+    """
+    Single-flight + short TTL cache for read-only Wix calls. Identical
+    concurrent calls share one request; identical calls within `ttl`
+    seconds get the stored body. Only successful bodies are cached, and
+    each caller parses its own copy. Bounded by entry count and by the
+    total size of the stored bodies.
+    """
+
+    def __init__(self, ttl: float, max_entries: int, max_bytes: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple, tuple[float, bytes]] = OrderedDict()
+        self._bytes = 0
+        self._in_flight: dict[tuple, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    async def fetch(self, key: tuple, load: Callable[[], Awaitable[bytes]], store: bool = True) -> bytes:
+        """
+        `store=False` only shares the call with identical concurrent ones:
+        for pages of a long traversal that nobody asks for again soon.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires, body = entry
+            if expires > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return body
+            self._drop(key)
+
+        task = self._in_flight.get(key)
+        if task is None:
+            self.misses += 1
+            # own task: a caller that gives up doesn't cancel it for the others
+            task = asyncio.ensure_future(self._load(key, load, store))
+            task.add_done_callback(_retrieve_exception)
+            self._in_flight[key] = task
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    async def _load(self, key: tuple, load: Callable[[], Awaitable[bytes]], store: bool) -> bytes:
+        try:
+            body = await load()
+            if store:
+                self._store(key, body)
+            return body
+        finally:
+            self._in_flight.pop(key, None)
+
+    def _drop(self, key: tuple):
+        _, body = self._entries.pop(key)
+        self._bytes -= len(body)
+
+    def _purge_expired(self, now: float):
+        for key in [key for key, (expires, _) in self._entries.items() if expires <= now]:
+            self._drop(key)
+
+    def _store(self, key: tuple, body: bytes):
+        if self.ttl <= 0 or len(body) > self.max_bytes:
+            return
+        now = time.monotonic()
+        # expired bodies would otherwise stay until their key is asked for again
+        self._purge_expired(now)
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (now + self.ttl, body)
+        self._bytes += len(body)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "in_flight": len(self._in_flight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+        }
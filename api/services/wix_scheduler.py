@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Wix answers these when it is throttling or briefly unavailable
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "DELETE"}
+
+
+class TokenBucket:
+    """`rate` requests per second on average, bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def is_retry_safe(method: str, endpoint: str) -> bool:
+    # Wix queries are POSTs but read-only, so they may be repeated
+    return method in IDEMPOTENT_METHODS or endpoint.rstrip("/").endswith("/query")
+
+
+class WixRequestScheduler:
+    """
+    Client-side flow control for Wix calls: a token bucket matching the Wix
+    rate limit, a cap on requests in flight, and retries with jittered
+    exponential backoff on 429/5xx/network errors (Retry-After wins).
+    A 429 pauses every caller, not just the one that got it.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        max_in_flight: int,
+        max_retries: int,
+        backoff_base: float,
+        backoff_max: float,
+    ):
+        self.bucket = TokenBucket(rate, burst)
+        self.in_flight = asyncio.Semaphore(max_in_flight)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._paused_until = 0.0
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+
+    def _backoff(self, attempt: int) -> float:
+        # "full jitter": spreads retries of parallel callers apart
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    async def _wait_for_pause(self):
+        delay = self._paused_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def send(
+        self,
+        method: str,
+        endpoint: str,
+        request: Callable[[], Awaitable[httpx.Response]],
+    ) -> httpx.Response:
+        """
+        Run `request()` under the rate limit, retrying transient failures.
+        Returns the last response (which may still be an error) or raises
+        the last network error once retries are used up.
+        """
+        retry_safe = is_retry_safe(method, endpoint)
+        attempt = 0
+        while True:
+            await self._wait_for_pause()
+            await self.bucket.acquire()
+            async with self.in_flight:
+                self.requests += 1
+                try:
+                    response = await request()
+                    error = None
+                except httpx.TransportError as exc:
+                    response, error = None, exc
+
+            if response is not None:
+                if response.status_code == 429:
+                    self.throttled += 1
+                # a 429 means Wix did not process the request, so any method may retry
+                retryable = response.status_code == 429 or (
+                    retry_safe and response.status_code in RETRY_STATUSES
+                )
+            else:
+                retryable = retry_safe
+
+            if not retryable or attempt >= self.max_retries:
+                if error is not None:
+                    raise error
+                return response
+
+            retry_after = parse_retry_after(response.headers.get("retry-after")) if response else None
+            delay = retry_after if retry_after is not None else self._backoff(attempt)
+            if response is not None and response.status_code == 429:
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+
+            attempt += 1
+            self.retries += 1
+            logger.info(
+                "Retrying Wix %s %s in %.2fs (attempt %d, %s)",
+                method,
+                endpoint,
+                delay,
+                attempt,
+                response.status_code if response is not None else error,
+            )
+            await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "throttled": self.throttled,
+        }
@@ -0,0 +1,180 @@
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from fastapi import HTTPException
+from jose import JWTError, jwt
+
+from database import SessionLocal
+from services.catalog_cache import mark_catalog_changed
+from services.catalog_index import refresh_catalog_index
+from services.product_sync_service import sync_wix_categories_by_id, sync_wix_products_by_id
+from services.sync_jobs import is_sync_running, run_in_sync_worker
+from settings import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# keys may be stored with escaped newlines in .env
+WIX_PUBLIC_KEY = settings.WIX_PUBLIC_KEY.replace("\\n", "\n")
+
+# last part of the Wix eventType -> (resource, action, id field in the event data)
+WIX_WEBHOOK_EVENTS = {
+    "ProductCreated": ("product", "upsert", "productId"),
+    "ProductChanged": ("product", "upsert", "productId"),
+    "ProductDeleted": ("product", "delete", "productId"),
+    "CollectionCreated": ("collection", "upsert", "collectionId"),
+    "CollectionChanged": ("collection", "upsert", "collectionId"),
+    "CollectionDeleted": ("collection", "delete", "collectionId"),
+}
+
+
+def decode_wix_webhook(token: str) -> tuple[str, dict]:
+    """
+    Verify a Wix webhook (an RS256 JWT signed for our app) and return
+    (event type, event data). Raises 401 when the signature or app is wrong.
+    """
+    try:
+        payload = jwt.decode(
+            token, WIX_PUBLIC_KEY, algorithms=["RS256"], options={"verify_aud": False}
+        )
+        event = json.loads(payload["data"])
+        data = event.get("data") or {}
+        if isinstance(data, str):
+            data = json.loads(data)
+        event_type = event["eventType"]
+    except (JWTError, KeyError, ValueError, TypeError):
+        raise HTTPException(status_code=401, detail="Invalid Wix webhook")
+
+    app_id = event.get("appId") or payload.get("appId")
+    if app_id and app_id != settings.WIX_APP_ID:
+        raise HTTPException(status_code=401, detail="Webhook is for another app")
+    return event_type, data
+
+
+def parse_wix_event(event_type: str, data: dict) -> tuple[str, str, str] | None:
+    """(resource, action, wix_id) of a catalog event, None for other events."""
+    known = WIX_WEBHOOK_EVENTS.get(event_type.rsplit(".", 1)[-1])
+    if not known:
+        return None
+    resource, action, id_field = known
+    wix_id = data.get(id_field) or data.get("id")
+    if not wix_id:
+        return None
+    return resource, action, wix_id
+
+
+@dataclass
+class PendingChange:
+    action: str
+    first_seen: float
+    due: float
+
+
+class WebhookCoalescer:
+    """
+    Debounces webhook events per (resource, wix_id). The latest action for
+    a key wins; a key is applied once no event arrived for `debounce`
+    seconds (at most `max_delay` after its first event). Keys that are due
+    within half a window of each other go out as one batch.
+    """
+
+    def __init__(
+        self,
+        apply: Callable[[dict[tuple[str, str], str]], Awaitable[None]],
+        debounce: float,
+        max_delay: float,
+        blocked: Callable[[], bool] = lambda: False,
+    ):
+        self._apply = apply
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self._blocked = blocked
+        self._pending: dict[tuple[str, str], PendingChange] = {}
+        self._task: asyncio.Task | None = None
+        self.events_received = 0
+        self.batches_applied = 0
+
+    def add(self, resource: str, wix_id: str, action: str):
+        now = time.monotonic()
+        key = (resource, wix_id)
+        pending = self._pending.get(key)
+        first_seen = pending.first_seen if pending else now
+        due = min(now + self.debounce, first_seen + self.max_delay)
+        self._pending[key] = PendingChange(action, first_seen, due)
+        self.events_received += 1
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while self._pending:
+            now = time.monotonic()
+            next_due = min(change.due for change in self._pending.values())
+            if next_due > now:
+                await asyncio.sleep(next_due - now)
+                continue
+            if self._blocked():
+                # e.g. a full sync is writing the same rows; try again later
+                await asyncio.sleep(self.debounce)
+                continue
+
+            # keys that are almost due ride along, so a burst goes out as one batch
+            horizon = now + self.debounce / 2
+            due = {key: change.action for key, change in self._pending.items() if change.due <= horizon}
+            for key in due:
+                del self._pending[key]
+            await self._apply_batch(due)
+
+    async def _apply_batch(self, changes: dict[tuple[str, str], str]):
+        try:
+            await self._apply(changes)
+            self.batches_applied += 1
+        except Exception:
+            # the next incremental sync picks these up
+            logger.exception("Applying %d Wix webhook changes failed", len(changes))
+
+    async def close(self):
+        """Stop waiting and apply whatever is still pending."""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        changes = {key: change.action for key, change in self._pending.items()}
+        self._pending.clear()
+        if changes:
+            await self._apply_batch(changes)
+
+
+async def apply_wix_changes(changes: dict[tuple[str, str], str]):
+    """Apply one coalesced batch: collections first, so new products can link to them."""
+
+    def ids(resource: str, action: str) -> list[str]:
+        return [wix_id for (kind, wix_id), wanted in changes.items() if kind == resource and wanted == action]
+
+    db = SessionLocal()
+    try:
+        categories = await sync_wix_categories_by_id(
+            db, ids("collection", "upsert"), ids("collection", "delete")
+        )
+        products = await sync_wix_products_by_id(
+            db, ids("product", "upsert"), ids("product", "delete")
+        )
+        logger.info("Wix webhook batch: categories %s, products %s", categories, products)
+
+        changed = products["created"] + products["updated"] + products["deleted"]
+        if changed or categories["synced"] or categories.get("deleted"):
+            await run_in_sync_worker(mark_catalog_changed, db)
+            await run_in_sync_worker(refresh_catalog_index, db)
+    finally:
+        await run_in_sync_worker(db.close)
+
+
+wix_webhook_coalescer = WebhookCoalescer(
+    apply_wix_changes,
+    debounce=settings.WIX_WEBHOOK_DEBOUNCE_SECONDS,
+    max_delay=settings.WIX_WEBHOOK_MAX_DELAY_SECONDS,
+    blocked=lambda: is_sync_running("products") or is_sync_running("categories"),
+)
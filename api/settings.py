@@ -10,11 +10,18 @@ class Settings(BaseSettings):
     WIX_APP_ID:str
     WIX_APP_SECRET:str
     WIX_PUBLIC_KEY:str
+    # point at a local stand-in, e.g. python -m scripts.wix_fixture_server
+    WIX_API_BASE: str = "https://www.wixapis.com/"
 
     BREVO_API_KEY: str
     BREVO_API_URL: str = "https://api.brevo.com/v3/smtp/email"
     BREVO_SENDER_EMAIL: str
     BREVO_SENDER_NAME: str = "Hoops"
+    BREVO_TIMEOUT_SECONDS: float = 10.0
+    BREVO_HTTP_MAX_CONNECTIONS: int = 10
+    BREVO_HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    # recipients (messageVersions) per batch call for one template
+    BREVO_BATCH_MAX_VERSIONS: int = 100
 
     CORS_ORIGIN: str = "http://localhost:3000"
     FRONTEND_URL: str = "http://localhost:3000"
@@ -26,6 +33,58 @@ class Settings(BaseSettings):
     AUTH_ALGORITM: str
     DATABASE_URL: str
 
+    # email outbox dispatcher: polls for due mails (and is woken on enqueue),
+    # retries failed sends with backoff until the attempts run out
+    EMAIL_OUTBOX_POLL_SECONDS: float = 5.0
+    EMAIL_OUTBOX_BATCH_SIZE: int = 50
+    EMAIL_OUTBOX_CONCURRENCY: int = 4
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = 8
+    EMAIL_OUTBOX_BACKOFF_BASE_SECONDS: float = 30.0
+    EMAIL_OUTBOX_BACKOFF_MAX_SECONDS: float = 3600.0
+    # a claimed mail is handed to another dispatcher if not done by then
+    EMAIL_OUTBOX_CLAIM_SECONDS: float = 120.0
+    EMAIL_OUTBOX_KEEP_SENT_DAYS: int = 30
+
+    CATALOG_CACHE_MAX_ENTRIES: int = 512
+    CATALOG_CACHE_MAX_MB: int = 64
+    # in-process columnar index for /product/filter (price/category/sort)
+    CATALOG_INDEX_ENABLED: bool = False
+    # a stale index is rebuilt in the background at most this often (syncs
+    # refresh it right away)
+    CATALOG_INDEX_MIN_REBUILD_SECONDS: float = 30.0
+
+    # Wix webhooks: changes to one wix_id are applied once it has been quiet
+    # for the debounce window, but never later than the max delay
+    WIX_WEBHOOK_DEBOUNCE_SECONDS: float = 2.0
+    WIX_WEBHOOK_MAX_DELAY_SECONDS: float = 30.0
+
+    # a full sync only deletes products/categories missing from Wix when Wix
+    # returned at least this share of what is stored
+    SYNC_SWEEP_MIN_RATIO: float = 0.5
+
+    # shared Wix HTTP client (one per worker, opened in the lifespan)
+    WIX_HTTP_MAX_CONNECTIONS: int = 20
+    WIX_HTTP_MAX_KEEPALIVE: int = 10
+    WIX_HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    WIX_HTTP2: bool = False  # needs the h2 package (pip install "httpx[http2]")
+    WIX_CONNECT_TIMEOUT: float = 5.0
+    WIX_READ_TIMEOUT: float = 10.0
+    WIX_WRITE_TIMEOUT: float = 10.0
+    WIX_POOL_TIMEOUT: float = 10.0
+
+    # client-side Wix flow control: token bucket, in-flight cap, retries
+    WIX_RATE_LIMIT_PER_SECOND: float = 10.0
+    WIX_RATE_LIMIT_BURST: int = 10
+    WIX_MAX_IN_FLIGHT: int = 8
+    WIX_MAX_RETRIES: int = 5
+    WIX_BACKOFF_BASE_SECONDS: float = 0.5
+    WIX_BACKOFF_MAX_SECONDS: float = 30.0
+
+    # single-flight + short TTL cache for read-only Wix calls (GET, */query)
+    WIX_READ_CACHE_TTL_SECONDS: float = 5.0
+    WIX_READ_CACHE_MAX_ENTRIES: int = 256
+    WIX_READ_CACHE_MAX_BYTES: int = 8 * 1024 * 1024
+
     @property
     def HTTP_ONLY_COOKIE_SECURE(self):
         return self.DEPLOYMENT_ENVIRONMENT != "DEV"
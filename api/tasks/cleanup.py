@@ -1,7 +1,11 @@
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from sqlalchemy.orm import Session
-from models import RefreshToken
+from database import SessionLocal
+from models import EmailOutbox, RefreshToken
 from dependencies.deps import get_db
+from settings import get_settings
+
+settings = get_settings()
 
 
 def cleanup_expired_refresh_tokens():
@@ -24,3 +28,22 @@ def cleanup_expired_refresh_tokens():
         db.rollback()
     finally:
         db_gen.close()
+
+
+def cleanup_sent_emails():
+    # delivered outbox rows are only kept for a while (failed ones stay for inspection)
+    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.EMAIL_OUTBOX_KEEP_SENT_DAYS)
+
+    # own session, like services.email_outbox (this runs outside any request)
+    with SessionLocal() as db:
+        try:
+            deleted = (
+                db.query(EmailOutbox)
+                .filter(EmailOutbox.status == "sent", EmailOutbox.sent_at < cutoff)
+                .delete(synchronize_session=False)
+            )
+            db.commit()
+            print(f"[CLEANUP] Deleted {deleted} sent emails from the outbox.")
+        except Exception as e:
+            print(f"[CLEANUP] Error: {e}")
+            db.rollback()
@@ -0,0 +1,113 @@
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# settings are read at import time, so the test env goes in before any app import
+_db_dir = tempfile.mkdtemp(prefix="api-tests-")
+for name, value in {
+    "WIX_API_KEY": "test",
+    "WIX_ACCOUNT_ID": "test",
+    "WIX_SITE_ID": "test",
+    "WIX_APP_ID": "test",
+    "WIX_APP_SECRET": "test",
+    "WIX_PUBLIC_KEY": "test",
+    "BREVO_API_KEY": "test",
+    "BREVO_SENDER_EMAIL": "noreply@example.com",
+    "AUTH_SECRET_KEY": "test",
+    "AUTH_ALGORITM": "HS256",
+    "DEPLOYMENT_ENVIRONMENT": "DEV",
+    "DATABASE_URL": f"sqlite:///{_db_dir}/test.sqlite",
+}.items():
+    os.environ.setdefault(name, value)
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, inspect, text
+
+import models
+from database import SessionLocal, engine
+from dependencies.deps import get_current_user, get_db
+
+
+@pytest.fixture
+def db():
+    # importing main creates the schema (and the full-text table) like on startup
+    import main  # noqa: F401
+
+    session = SessionLocal()
+    yield session
+    session.close()
+    with engine.begin() as connection:
+        for table in reversed(models.Base.metadata.sorted_tables):
+            connection.execute(table.delete())
+        if inspect(connection).has_table("products_fts"):
+            connection.execute(text("DELETE FROM products_fts"))
+
+
+@pytest.fixture
+def client(db):
+    from main import app
+
+    def session():
+        yield db
+
+    app.dependency_overrides[get_db] = session
+    app.dependency_overrides[get_current_user] = lambda: {"id": 1, "role": "admin", "company_id": 1}
+    # no `with`: the lifespan (Wix/Brevo clients, outbox, scheduler) isn't needed
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+@contextmanager
+def count_queries():
+    """Count the SQL statements sent to the test database."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+@dataclass
+class LocalServer:
+    url: str
+    connections: int = 0
+
+
+@pytest.fixture
+def local_server():
+    """
+    Start local HTTP servers for a handler class (keep-alive if the handler
+    speaks HTTP/1.1). Each one counts the TCP connections it accepts.
+    """
+    servers = []
+
+    def start(handler_class: type[BaseHTTPRequestHandler]) -> LocalServer:
+        local = LocalServer(url="")
+        lock = threading.Lock()
+
+        class CountingHandler(handler_class):
+            def setup(self):
+                with lock:
+                    local.connections += 1
+                super().setup()
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), CountingHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        local.url = f"http://127.0.0.1:{server.server_port}/"
+        return local
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
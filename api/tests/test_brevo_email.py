@@ -0,0 +1,126 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+from conftest import LocalServer
+from services import brevo_email
+from services.brevo_email import BrevoEmailError, send_brevo_template_email
+from services.email_outbox import OutboxMessage, deliver_outbox_messages, settings
+
+
+class FakeBrevo:
+    """Records every send; rejects a whole batch if any recipient is "bad"."""
+
+    def __init__(self):
+        self.server: LocalServer | None = None
+        self.payloads: list[dict] = []
+        self._lock = threading.Lock()
+
+    def respond(self, payload: dict) -> tuple[int, dict]:
+        versions = payload.get("messageVersions") or [{"to": payload["to"]}]
+        emails = [recipient["email"] for version in versions for recipient in version["to"]]
+        with self._lock:
+            self.payloads.append(payload)
+            sent = len(self.payloads)
+        if any(email.startswith("bad") for email in emails):
+            return 400, {"code": "invalid_parameter", "message": "email is not valid"}
+        if "messageVersions" in payload:
+            return 201, {"messageIds": [f"<{sent}.{n}@brevo>" for n in range(len(emails))]}
+        return 201, {"messageId": f"<{sent}@brevo>"}
+
+
+@pytest.fixture
+def brevo(local_server, monkeypatch):
+    fake = FakeBrevo()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            status, response = fake.respond(payload)
+            body = json.dumps(response).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    fake.server = local_server(Handler)
+    monkeypatch.setattr(brevo_email, "BREVO_API_URL", fake.server.url + "v3/smtp/email")
+    return fake
+
+
+def run_with_client(coro):
+    async def run():
+        await brevo_email.start_brevo_client()
+        try:
+            return await coro
+        finally:
+            await brevo_email.close_brevo_client()
+
+    return asyncio.run(run())
+
+
+def outbox_message(id: int, email: str, template_id: int = 1) -> OutboxMessage:
+    return OutboxMessage(
+        id=id,
+        to_email=email,
+        to_name=None,
+        template_id=template_id,
+        params={"N": id},
+        attempts=0,
+        claim_token="test",
+    )
+
+
+def test_single_sends_reuse_one_connection(brevo):
+    async def send_all():
+        return [await send_brevo_template_email(f"user{n}@example.com", "User", 1, {}) for n in range(5)]
+
+    responses = run_with_client(send_all())
+
+    assert [response["messageId"] for response in responses] == [f"<{n}@brevo>" for n in range(1, 6)]
+    assert brevo.server.connections == 1
+
+
+def test_batches_are_chunked_per_template(brevo, monkeypatch):
+    monkeypatch.setattr(settings, "BREVO_BATCH_MAX_VERSIONS", 3)
+    messages = [outbox_message(n, f"user{n}@example.com") for n in range(7)]
+    messages += [outbox_message(n, f"user{n}@example.com", template_id=2) for n in range(7, 9)]
+
+    outcomes = run_with_client(deliver_outbox_messages(messages, concurrency=2))
+
+    assert all(error is None and response["messageId"] for _, response, error in outcomes)
+    assert sorted(message.id for message, _, _ in outcomes) == list(range(9))
+    # template 1: 3 + 3 as messageVersions, the last one alone; template 2: one batch of 2
+    shapes = sorted(
+        (payload["templateId"], len(payload.get("messageVersions") or [None])) for payload in brevo.payloads
+    )
+    assert shapes == [(1, 1), (1, 3), (1, 3), (2, 2)]
+    assert [payload for payload in brevo.payloads if "messageVersions" not in payload][0]["to"] == [
+        {"email": "user6@example.com"}
+    ]
+
+
+def test_rejected_batch_falls_back_to_single_sends(brevo):
+    messages = [
+        outbox_message(1, "user1@example.com"),
+        outbox_message(2, "bad@example"),
+        outbox_message(3, "user3@example.com"),
+    ]
+
+    delivered = run_with_client(deliver_outbox_messages(messages, concurrency=1))
+    outcomes = {message.id: (response, error) for message, response, error in delivered}
+
+    # the batch, then one send per mail
+    assert len(brevo.payloads) == 4
+    assert "messageVersions" in brevo.payloads[0]
+    assert outcomes[1][1] is None and outcomes[3][1] is None
+    assert isinstance(outcomes[2][1], BrevoEmailError) and outcomes[2][1].status_code == 400
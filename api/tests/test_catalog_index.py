@@ -0,0 +1,38 @@
+import threading
+
+from services import catalog_index as catalog_index_module
+from services.catalog_index import CatalogIndexHolder
+
+
+def test_stale_lookups_start_one_rebuild_per_interval(monkeypatch):
+    builds = []
+    release = threading.Event()
+
+    def build_catalog_index(db):
+        builds.append(db)
+        release.wait(5)
+        return None
+
+    monkeypatch.setattr(catalog_index_module, "build_catalog_index", build_catalog_index)
+    holder = CatalogIndexHolder(enabled=True, min_rebuild_seconds=60)
+
+    # a sync commits batch after batch: every request sees a new version
+    threads = [threading.Thread(target=holder.lookup, args=(f"v{n}",)) for n in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    release.set()
+    with holder._rebuilding:
+        pass  # background rebuild done
+    assert len(builds) == 1
+
+    # still within the interval
+    assert holder.lookup("v21") is None
+    assert len(builds) == 1
+
+    holder.min_rebuild_seconds = 0
+    holder.lookup("v22")
+    with holder._rebuilding:
+        pass
+    assert len(builds) == 2
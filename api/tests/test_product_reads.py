@@ -0,0 +1,123 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import count_queries
+from models import Category, Product, ProductAdditionalInfo, ProductImage
+from services.catalog_cache import mark_catalog_changed
+from services.product_search import reindex_products
+
+READ_ENDPOINTS = [
+    "/product/",
+    "/product/?limit=20",
+    "/product/filter?min_price=0",
+    "/product/product/1",
+    "/product/categories",
+    "/product/category/1",
+    "/product/category/1/products",
+    # read model documents (rendered on read here: add_catalog doesn't render them)
+    "/product/?fast=true",
+    "/product/category/1/products?fast=true",
+    "/product/?fields=name,price,images",
+    "/product/product/1?fields=name,categories",
+    "/product/filter?q=glazed",
+    "/product/export",
+    "/product/export?format=csv",
+]
+
+
+def add_catalog(db, products: int, categories: int):
+    """
+    Add products with images, info sections and two categories each. Every
+    fifth one is a "glazed" mug, for search. No read model documents.
+    """
+    start = db.query(Product).count()
+    existing = db.query(Category).order_by(Category.id).all()
+    new_categories = [
+        Category(wix_id=f"c{len(existing) + i}", name=f"Category {len(existing) + i}")
+        for i in range(categories)
+    ]
+    db.add_all(new_categories)
+    all_categories = existing + new_categories
+
+    now = datetime(2026, 1, 1)
+    added = []
+    for i in range(start, start + products):
+        added.append(
+            Product(
+                wix_id=f"p{i}",
+                name=f"Product {i}",
+                description="Glazed mug" if i % 5 == 0 else "Plain cup",
+                price=10.0 + i,
+                discounted_type="NONE",
+                discounted_amount=0.0,
+                discounted_price=10.0 + i,
+                last_updated=now + timedelta(minutes=i),
+                images=[ProductImage(media_url=f"https://img/{i}/{n}.jpg", thumbnail_url=None) for n in range(2)],
+                additional_info_sections=[ProductAdditionalInfo(title="Care", description="Wash cold")],
+                categories=[all_categories[0], all_categories[1 + i % (len(all_categories) - 1)]],
+            )
+        )
+    db.add_all(added)
+    db.flush()
+    reindex_products(db, [product.id for product in added])
+    db.commit()
+    # new catalog version, so cached responses aren't reused
+    mark_catalog_changed(db)
+
+
+@pytest.mark.parametrize("path", READ_ENDPOINTS)
+def test_query_count_does_not_grow_with_catalog(client, db, path):
+    add_catalog(db, products=5, categories=2)
+    with count_queries() as small:
+        assert client.get(path).status_code == 200
+
+    add_catalog(db, products=60, categories=8)
+    with count_queries() as large:
+        response = client.get(path)
+    assert response.status_code == 200
+
+    assert len(large) == len(small), f"{path}: {len(small)} queries for 5 products, {len(large)} for 65"
+
+
+def test_fast_documents_match_the_orm_response(client, db):
+    add_catalog(db, products=5, categories=2)
+
+    fast = client.get("/product/?fast=true")
+    assert fast.status_code == 200
+    assert fast.json() == client.get("/product/").json()
+    assert client.get("/product/category/1/products?fast=true").json() == client.get(
+        "/product/category/1/products"
+    ).json()
+
+
+def test_fields_returns_only_the_requested_fields(client, db):
+    add_catalog(db, products=5, categories=2)
+
+    products = client.get("/product/?fields=name,price,images").json()
+
+    assert len(products) == 5
+    assert all(set(product) == {"id", "name", "price", "images"} for product in products)
+    assert all(len(product["images"]) == 2 for product in products)
+    assert set(client.get("/product/product/1?fields=categories").json()) == {"id", "categories"}
+
+
+def test_search_finds_matching_products(client, db):
+    add_catalog(db, products=20, categories=2)
+
+    products = client.get("/product/filter?q=glazed").json()
+
+    assert sorted(product["wix_id"] for product in products) == [f"p{i}" for i in (0, 10, 15, 5)]
+
+
+def test_export_has_every_product(client, db):
+    add_catalog(db, products=12, categories=2)
+
+    lines = client.get("/product/export").text.splitlines()
+    assert sorted(json.loads(line)["wix_id"] for line in lines) == sorted(f"p{i}" for i in range(12))
+
+    rows = list(csv.DictReader(io.StringIO(client.get("/product/export?format=csv").text)))
+    assert len(rows) == 12 and rows[0]["wix_id"] == "p0"
@@ -0,0 +1,147 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from conftest import count_queries
+from helpers.wix_mapper import parse_wix_datetime
+from models import Category, Product, ProductImage
+from scripts.wix_fixture_server import WixFixture, make_handler, synthetic_catalog
+from services import wix_api_service
+from services.product_sync_service import (
+    WIX_PRODUCTS_SOURCE,
+    get_sync_watermark,
+    run_wix_category_sync,
+    run_wix_product_sync,
+)
+
+
+@pytest.fixture
+def wix(local_server, monkeypatch):
+    """Fixture-server Wix catalog the sync talks to."""
+    fixture = WixFixture(synthetic_catalog(40, 4))
+    server = local_server(make_handler(fixture))
+    monkeypatch.setattr(wix_api_service, "WIX_API_BASE", server.url)
+    return fixture
+
+
+def sync(db, full: bool = False):
+    async def run():
+        await wix_api_service.start_wix_client()
+        try:
+            await run_wix_category_sync(db)
+            return await run_wix_product_sync(db, full=full)
+        finally:
+            await wix_api_service.close_wix_client()
+
+    return asyncio.run(run())
+
+
+def remove_from_wix(wix: WixFixture, count: int) -> list[dict]:
+    removed = wix.products[:count]
+    wix.products[:] = wix.products[count:]
+    wix._listings.clear()
+    return removed
+
+
+def stored_wix_ids(db) -> set[str]:
+    db.expire_all()
+    return set(db.scalars(select(Product.wix_id)))
+
+
+def test_full_sync_sweeps_products_removed_in_wix(wix, db):
+    assert sync(db, full=True).created == 40
+    removed = remove_from_wix(wix, 3)
+
+    result = sync(db, full=True)
+
+    assert stored_wix_ids(db) == {item["id"] for item in wix.products}
+    counts = result.counts()
+    assert counts["deleted"] == 3
+    assert counts["deleted_images"] == sum(len(item["media"]["items"]) for item in removed)
+    assert counts["deleted_info_sections"] == 3
+    assert "sweep_refused" not in counts
+    assert db.query(ProductImage).count() == sum(len(item["media"]["items"]) for item in wix.products)
+
+
+def test_sweep_refused_when_wix_returns_too_few(wix, db):
+    sync(db, full=True)
+    remove_from_wix(wix, 38)
+
+    result = sync(db, full=True)
+
+    assert result.sweep_refused
+    assert result.counts()["sweep_refused"] == 1
+    assert result.counts()["deleted"] == 0
+    assert len(stored_wix_ids(db)) == 40
+    assert db.query(Category).count() == 4
+
+
+def test_incremental_sync_never_sweeps(wix, db):
+    sync(db, full=True)
+    remove_from_wix(wix, 3)
+    wix.touch(2)
+
+    result = sync(db)
+
+    assert result.updated == 2
+    assert result.counts()["deleted"] == 0
+    assert len(stored_wix_ids(db)) == 40
+
+
+CHILD_TABLES = ("product_images", "product_additional_infos", "product_categories")
+
+
+def child_table_writes(statements: list[str]) -> list[str]:
+    return [
+        statement
+        for statement in statements
+        if statement.lstrip().split(None, 1)[0].upper() in ("INSERT", "UPDATE", "DELETE")
+        and any(table in statement for table in CHILD_TABLES)
+    ]
+
+
+def test_unchanged_products_are_skipped(wix, db):
+    sync(db, full=True)
+
+    with count_queries() as statements:
+        result = sync(db)
+
+    assert result.created == result.updated == 0
+    assert result.unchanged == len(result.product_ids) > 0
+    assert child_table_writes(statements) == []
+
+
+def test_one_edit_in_wix_updates_one_product(wix, db):
+    sync(db, full=True)
+    wix.touch(1)
+
+    result = sync(db)
+
+    assert (result.created, result.updated) == (0, 1)
+
+
+def watermark(db) -> datetime | None:
+    db.expire_all()
+    return get_sync_watermark(db, WIX_PRODUCTS_SOURCE)
+
+
+def test_watermark_only_moves_forward(wix, db):
+    sync(db, full=True)
+    first = watermark(db)
+    newest = max(wix.products, key=lambda item: item["lastUpdated"])
+    # naive UTC, the newest lastUpdated Wix returned
+    assert first == parse_wix_datetime(newest["lastUpdated"]) and first.tzinfo is None
+
+    wix.touch(2)
+    sync(db)
+    second = watermark(db)
+    assert second > first
+
+    # the newest products are deleted in Wix and swept: the watermark stays
+    wix.products[:] = sorted(wix.products, key=lambda item: item["lastUpdated"])[:-2]
+    wix._listings.clear()
+    result = sync(db, full=True)
+    assert result.counts()["deleted"] == 2
+    assert watermark(db) == second
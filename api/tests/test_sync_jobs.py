@@ -0,0 +1,33 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from services.sync_jobs import submit_sync_job
+
+
+def test_running_sync_is_shared_only_in_the_same_mode():
+    async def run():
+        release = asyncio.Event()
+
+        async def runner(job):
+            await release.wait()
+
+        incremental = submit_sync_job("test-products", runner)
+        try:
+            assert submit_sync_job("test-products", runner) is incremental
+            with pytest.raises(HTTPException) as refused:
+                submit_sync_job("test-products", runner, full=True)
+            assert refused.value.status_code == 409
+        finally:
+            release.set()
+            await incremental.task
+
+        # once it's done, a full sync starts normally
+        release.clear()
+        full = submit_sync_job("test-products", runner, full=True)
+        assert full is not incremental and full.full
+        release.set()
+        await full.task
+
+    asyncio.run(run())
@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+
+from scripts.wix_fixture_server import PRODUCT_ENDPOINTS, WixFixture, make_handler, synthetic_catalog
+from services import wix_api_service
+
+
+@pytest.fixture
+def wix_server(local_server, monkeypatch):
+    server = local_server(make_handler(WixFixture(synthetic_catalog(20, 2))))
+    monkeypatch.setattr(wix_api_service, "WIX_API_BASE", server.url)
+    return server
+
+
+def test_wix_calls_reuse_one_connection(wix_server):
+    calls = 10
+
+    async def run():
+        await wix_api_service.start_wix_client()
+        try:
+            for offset in range(calls):
+                # fresh: every call goes over the wire, not through the read cache
+                data = await wix_api_service.wix_post_request(
+                    PRODUCT_ENDPOINTS[0],
+                    {"query": {"paging": {"limit": 2, "offset": offset}}},
+                    fresh=True,
+                )
+                assert len(data["products"]) == 2
+        finally:
+            await wix_api_service.close_wix_client()
+
+    asyncio.run(run())
+    assert wix_server.connections == 1